@@ -0,0 +1,192 @@
+"""
+Bu modül, eşzamanlı txt2img isteklerini dinamik olarak toplu üretimde birleştirir.
+
+Aynı model, LoRA, çözünürlük, adım sayısı, guidance ve örnekleyiciyi kullanan
+istekler kısa bir bekleme penceresi içinde toplanır, tek bir toplu üretimde
+çalıştırılır ve sonuçlar her isteğe ayrı ayrı geri dağıtılır.
+
+İşçi iş parçacığı yalnızca toplu txt2img isteklerini sıraya koyar; img2img, iş
+akışları ve ön yükleme aynı pipeline'lara kendi iş parçacıklarından erişir. Aynı
+modelin çalıştırılması model_manager.pipeline_session ile model başına sıralanır.
+"""
+
+import time
+import logging
+import threading
+import torch
+from collections import OrderedDict
+from txt2img import generate_image_from_text, generate_images_from_text
+from pipeline_callbacks import CombinedCancellationToken, GenerationCancelled
+
+logger = logging.getLogger(__name__)
+
+# Varsayılan toplama penceresi (saniye) ve en büyük toplu üretim boyutu
+DEFAULT_MAX_WAIT = 0.05
+DEFAULT_MAX_BATCH_SIZE = 4
+
+class BatchRequest:
+    """Toplu üretimi bekleyen tek bir istek"""
+
+    def __init__(self, prompt, seed, preview_callback=None, cancel_token=None):
+        self.prompt = prompt
+        self.seed = seed
+        self.preview_callback = preview_callback
+        self.cancel_token = cancel_token
+        self.created = time.time()
+        self.done = threading.Event()
+        self.result = None
+
+class MicroBatcher:
+    """Uyumlu istekleri toplayıp tek bir toplu üretimde çalıştıran zamanlayıcı"""
+
+    def __init__(self, max_wait=DEFAULT_MAX_WAIT, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        # anahtar -> bekleyen istek listesi (en eski grup başta)
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.stats = {"requests": 0, "batches": 0}
+        self.worker = threading.Thread(target=self._run, name="txt2img-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, prompt, seed=None, preview_callback=None, cancel_token=None, **params):
+        """
+        İsteği kuyruğa ekler ve toplu üretim tamamlanana kadar bekler
+
+        Args:
+            prompt (str): Görsel açıklaması
+            seed (int): Tohum (None ise rastgele; toplu üretimde her isteğin kendi tohumu vardır)
+            preview_callback: fn(adım, toplam adım, önizleme görseli) - yalnızca bu isteğin önizlemeleri
+            cancel_token (CancellationToken): İptal edilen istek hemen döner; toplu üretim ancak
+                tüm istekleri iptal edilirse durdurulur
+            **params: generate_images_from_text parametreleri (model_id, lora_id, width, ...)
+
+        Returns:
+            dict: {"prompt", "seed", "image"}
+            
+        Raises:
+            GenerationCancelled: İstek iptal edildiğinde veya süresi dolduğunda
+        """
+        if seed is None:
+            seed = int(torch.randint(0, 2147483647, (1,)).item())
+
+        key = tuple(sorted(params.items()))
+        request = BatchRequest(prompt, seed, preview_callback, cancel_token)
+
+        with self.condition:
+            self.pending.setdefault(key, []).append(request)
+            self.stats["requests"] += 1
+            self.condition.notify()
+
+        while not request.done.wait(0.1):
+            if cancel_token and cancel_token.cancelled:
+                # Henüz çalışmaya başlamadıysa kuyruktan çıkar
+                with self.condition:
+                    requests = self.pending.get(key)
+                    if requests and request in requests:
+                        requests.remove(request)
+                        if not requests:
+                            del self.pending[key]
+                cancel_token.check()
+        return request.result
+
+    def _next_batch(self):
+        """En eski grubun dolmasını veya bekleme süresinin dolmasını bekler"""
+        with self.condition:
+            while True:
+                if not self.pending:
+                    self.condition.wait()
+                    continue
+
+                key, requests = next(iter(self.pending.items()))
+                remaining = requests[0].created + self.max_wait - time.time()
+                if len(requests) >= self.max_batch_size or remaining <= 0:
+                    batch = requests[:self.max_batch_size]
+                    del requests[:self.max_batch_size]
+                    if not requests:
+                        del self.pending[key]
+                    else:
+                        # Kalan istekler sırasını korusun ama diğer gruplara da sıra gelsin
+                        self.pending.move_to_end(key)
+                    return key, batch
+
+                self.condition.wait(remaining)
+
+    def _run(self):
+        """Toplu üretim işçi döngüsü"""
+        while True:
+            key, batch = self._next_batch()
+            params = dict(key)
+            waited = time.time() - batch[0].created
+            logger.info(f"Toplu üretim: {len(batch)} istek birleştirildi (bekleme: {waited * 1000:.0f} ms)")
+
+            # Önizlemeleri batch içindeki sırasına göre ilgili isteğe yönlendir
+            def dispatch_preview(index, step, total_steps, image, batch=batch):
+                if batch[index].preview_callback:
+                    batch[index].preview_callback(step, total_steps, image)
+
+            # Toplu üretim yalnızca tüm istekler iptal edilirse durur
+            tokens = [request.cancel_token for request in batch]
+            
+            results = []
+            try:
+                results = generate_images_from_text(
+                    [request.prompt for request in batch],
+                    seeds=[request.seed for request in batch],
+                    preview_callback=dispatch_preview if any(request.preview_callback for request in batch) else None,
+                    cancel_token=CombinedCancellationToken(tokens) if all(tokens) else None,
+                    **params
+                )
+            except GenerationCancelled:
+                logger.info("Toplu üretim durduruldu: tüm istekler iptal edildi")
+            except Exception as e:
+                logger.error(f"Toplu üretim hatası: {e}")
+
+            self.stats["batches"] += 1
+            for index, request in enumerate(batch):
+                if index < len(results):
+                    request.result = results[index]
+                else:
+                    request.result = {"prompt": request.prompt, "seed": request.seed, "image": None}
+                request.done.set()
+
+    def get_stats(self):
+        """İstek ve toplu üretim istatistiklerini döndürür"""
+        with self.condition:
+            stats = dict(self.stats)
+            stats["pending"] = sum(len(requests) for requests in self.pending.values())
+        stats["average_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+# Sunucu genelinde kullanılan zamanlayıcı (None ise toplu üretim kapalı)
+batcher = None
+
+def configure_batching(max_wait=DEFAULT_MAX_WAIT, max_batch_size=DEFAULT_MAX_BATCH_SIZE):
+    """Dinamik toplu üretimi yapılandırır (max_batch_size <= 1 ise kapatır)"""
+    global batcher
+    if max_batch_size <= 1:
+        batcher = None
+        logger.info("Dinamik toplu üretim kapalı")
+        return
+
+    if batcher is None:
+        batcher = MicroBatcher(max_wait, max_batch_size)
+    else:
+        batcher.max_wait = max_wait
+        batcher.max_batch_size = max_batch_size
+    logger.info(f"Dinamik toplu üretim: en fazla {max_batch_size} istek, {max_wait * 1000:.0f} ms bekleme")
+
+def generate_image(prompt, seed=None, preview_callback=None, cancel_token=None, **params):
+    """
+    Görsel üretir; toplu üretim açıksa isteği uyumlu isteklerle birleştirir
+
+    Returns:
+        PIL.Image: Oluşturulan görsel
+    """
+    if batcher is None:
+        return generate_image_from_text(prompt, seed=seed, preview_callback=preview_callback, cancel_token=cancel_token, **params)
+    return batcher.submit(prompt, seed, preview_callback, cancel_token, **params)["image"]
+
+def get_batching_stats():
+    """Toplu üretim istatistiklerini döndürür (kapalıysa None)"""
+    return batcher.get_stats() if batcher else None
@@ -0,0 +1,105 @@
+"""
+Bu modül, UNet ve VAE için torch.compile hızlandırma modunu yönetir.
+
+Derlenmiş çekirdekler kalıcı bir Inductor önbelleğinde saklanır; böylece yeniden
+başlatılan bir sunucu aynı (model, veri tipi, çözünürlük, batch) için derlemeyi
+tekrar yapmaz. Yeniden derlemeleri sınırlamak için istek çözünürlükleri sabit
+kovalara (bucket) yuvarlanır.
+"""
+
+import os
+import json
+import logging
+import threading
+import torch
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Kalıcı derleme önbelleği
+COMPILE_CACHE_DIR = Path(os.path.expanduser("~/.cache/imggenai/compiled"))
+COMPILED_SHAPES_PATH = COMPILE_CACHE_DIR / "compiled_shapes.json"
+
+# Derlenen modellerin çalıştırılacağı çözünürlük kovaları
+COMPILE_SHAPE_BUCKETS = (512, 640, 768, 896, 1024)
+
+# Derlenen bileşenler: (pipeline bileşeni, alt modül)
+COMPILE_TARGETS = (("unet", None), ("vae", "decoder"))
+
+_shapes_lock = threading.Lock()
+
+def configure_compile_cache():
+    """Inductor'ın derlenmiş grafikleri diskte saklamasını sağlar"""
+    COMPILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", str(COMPILE_CACHE_DIR / "inductor"))
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    os.environ.setdefault("TORCHINDUCTOR_AUTOGRAD_CACHE", "1")
+
+    # Her kova ve batch boyutu ayrı bir grafik olduğundan sınırı buna göre ayarla
+    if hasattr(torch, "_dynamo"):
+        torch._dynamo.config.cache_size_limit = max(
+            torch._dynamo.config.cache_size_limit,
+            len(COMPILE_SHAPE_BUCKETS) ** 2
+        )
+
+def compile_pipeline(pipe):
+    """
+    Pipeline'ın UNet ve VAE decoder modüllerini yerinde derler
+
+    Modüller yerinde derlendiği için aynı bileşenleri paylaşan görev pipeline'ları da
+    derlenmiş sürümü kullanır. Derleme ilk çağrıda (tembel olarak) yapılır.
+
+    Returns:
+        bool: Derleme etkinleştirildiyse True
+    """
+    if not hasattr(torch, "compile") or not hasattr(torch.nn.Module, "compile"):
+        logger.warning("Bu PyTorch sürümü modül derlemeyi desteklemiyor (torch>=2.2 gerekli)")
+        return False
+
+    configure_compile_cache()
+
+    for component_name, submodule_name in COMPILE_TARGETS:
+        module = getattr(pipe, component_name, None)
+        if module is not None and submodule_name:
+            module = getattr(module, submodule_name, None)
+        if module is None:
+            continue
+        module.compile(fullgraph=False, dynamic=False)
+
+    return True
+
+def bucket_resolution(width, height):
+    """Çözünürlüğü en yakın büyük kovaya yuvarlar (kovalardan büyükse 128'in katına)"""
+    def snap(value):
+        for bucket in COMPILE_SHAPE_BUCKETS:
+            if value <= bucket:
+                return bucket
+        return ((value + 127) // 128) * 128
+    return snap(width), snap(height)
+
+def record_compiled_shape(model_key, dtype, width, height, batch_size):
+    """
+    Derlenmiş (model, veri tipi, çözünürlük, batch) kombinasyonunu kaydeder
+
+    Returns:
+        bool: Kombinasyon ilk kez görülüyorsa True (derleme süresi beklenir)
+    """
+    shape = f"{dtype}|{width}x{height}|{batch_size}"
+    with _shapes_lock:
+        shapes = {}
+        if COMPILED_SHAPES_PATH.exists():
+            try:
+                with open(COMPILED_SHAPES_PATH, "r") as f:
+                    shapes = json.load(f)
+            except Exception as e:
+                logger.debug(f"Derleme kayıtları okunamadı: {e}")
+
+        known = shapes.setdefault(model_key, [])
+        if shape in known:
+            return False
+
+        known.append(shape)
+        COMPILE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(COMPILED_SHAPES_PATH, "w") as f:
+            json.dump(shapes, f, indent=4)
+        return True
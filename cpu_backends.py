@@ -0,0 +1,174 @@
+"""
+Bu modül, GPU olmayan sunucular için alternatif CPU çalıştırma motorlarını yönetir.
+
+Modelin text encoder, UNet ve VAE bileşenleri bir kez ONNX Runtime veya OpenVINO
+formatına dışa aktarılır, diskte önbelleğe alınır ve sonraki yüklemelerde doğrudan
+bu önbellekten çalıştırılır.
+"""
+
+import os
+import shutil
+import logging
+import numpy as np
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Optimum kütüphanelerini kontrollü bir şekilde import et
+try:
+    from optimum.onnxruntime import ORTStableDiffusionPipeline, ORTStableDiffusionImg2ImgPipeline
+    ONNX_AVAILABLE = True
+except ImportError:
+    ORTStableDiffusionPipeline = ORTStableDiffusionImg2ImgPipeline = None
+    ONNX_AVAILABLE = False
+
+try:
+    from optimum.intel import OVStableDiffusionPipeline, OVStableDiffusionImg2ImgPipeline
+    OPENVINO_AVAILABLE = True
+except ImportError:
+    OVStableDiffusionPipeline = OVStableDiffusionImg2ImgPipeline = None
+    OPENVINO_AVAILABLE = False
+
+# Dışa aktarılmış modellerin önbellek dizini
+EXPORT_CACHE_DIR = Path(os.path.expanduser("~/.cache/imggenai/exported"))
+
+# load_model için cihaz adı olarak kullanılabilen CPU motorları
+CPU_BACKENDS = {
+    "cpu-onnx": {
+        "name": "ONNX Runtime",
+        "install": "pip install optimum[onnxruntime]",
+        "available": ONNX_AVAILABLE,
+        "pipelines": {
+            "txt2img": ORTStableDiffusionPipeline,
+            "img2img": ORTStableDiffusionImg2ImgPipeline
+        }
+    },
+    "cpu-openvino": {
+        "name": "OpenVINO",
+        "install": "pip install optimum[openvino]",
+        "available": OPENVINO_AVAILABLE,
+        "pipelines": {
+            "txt2img": OVStableDiffusionPipeline,
+            "img2img": OVStableDiffusionImg2ImgPipeline
+        }
+    }
+}
+
+# Dışa aktarılmış model dosyalarının uzantıları (bellek tahmini için)
+EXPORTED_WEIGHT_SUFFIXES = (".onnx", ".onnx_data", ".bin", ".xml")
+
+def is_cpu_backend(device):
+    """Cihaz adının alternatif bir CPU motoru olup olmadığını döndürür"""
+    return device in CPU_BACKENDS
+
+def list_cpu_backends():
+    """Kurulu CPU motorlarını listeler"""
+    return [device for device, info in CPU_BACKENDS.items() if info["available"]]
+
+def get_export_dir(model_id, device):
+    """Modelin dışa aktarılmış kopyasının önbellek dizinini döndürür"""
+    return EXPORT_CACHE_DIR / device / model_id
+
+def estimate_footprint(export_dir):
+    """Dışa aktarılmış model dosyalarının toplam boyutunu (RAM tahmini) döndürür"""
+    total = 0
+    for path in Path(export_dir).rglob("*"):
+        if path.is_file() and path.suffix in EXPORTED_WEIGHT_SUFFIXES:
+            total += path.stat().st_size
+    return total
+
+def load_backend_pipeline(device, model_id, source):
+    """
+    Modeli belirtilen CPU motoru için yükler; ilk yüklemede dışa aktarıp önbelleğe alır
+
+    Temel pipeline her zaman txt2img sınıfıyla yüklenir; diğer görevler
+    derive_backend_pipeline ile bunun oturumlarından oluşturulur.
+
+    Args:
+        device: "cpu-onnx" veya "cpu-openvino"
+        model_id: Model kimliği (önbellek dizini adı)
+        source: Hub deposu veya yerel snapshot dizini
+
+    Returns:
+        tuple: (pipeline, dışa aktarma dizini)
+    """
+    backend = CPU_BACKENDS[device]
+    if not backend["available"]:
+        raise RuntimeError(f"{backend['name']} kurulu değil. Yüklemek için: {backend['install']}")
+
+    pipeline_class = backend["pipelines"]["txt2img"]
+    export_dir = get_export_dir(model_id, device)
+
+    if (export_dir / "model_index.json").exists():
+        logger.info(f"Dışa aktarılmış model önbellekten yükleniyor: {export_dir}")
+        return pipeline_class.from_pretrained(export_dir), export_dir
+
+    # İlk kullanım: modeli dışa aktar ve yarım kalan kayıtlar kullanılmasın diye geçici dizinden taşı
+    logger.info(f"Model {backend['name']} formatına dışa aktarılıyor (tek seferlik): {model_id}")
+    pipe = pipeline_class.from_pretrained(source, export=True)
+
+    tmp_dir = export_dir.with_name(export_dir.name + ".tmp")
+    try:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        pipe.save_pretrained(tmp_dir)
+        if export_dir.exists():
+            shutil.rmtree(export_dir)
+        export_dir.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_dir, export_dir)
+        logger.info(f"Dışa aktarılan model önbelleğe kaydedildi: {export_dir}")
+    except Exception as e:
+        logger.warning(f"Dışa aktarılan model kaydedilemedi: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return pipe, export_dir
+
+def derive_backend_pipeline(base_pipe, device, task):
+    """
+    Temel (txt2img) pipeline'ın alt modellerini paylaşan görev pipeline'ını oluşturur
+
+    Text encoder, UNet ve VAE oturumları yeniden yüklenmez; görev sınıfı aynı
+    ONNX Runtime oturumlarının veya derlenmiş OpenVINO isteklerinin etrafına kurulur.
+
+    Args:
+        base_pipe: load_backend_pipeline ile yüklenen pipeline
+        device: "cpu-onnx" veya "cpu-openvino"
+        task: "txt2img" veya "img2img"
+
+    Returns:
+        Görev pipeline'ı
+    """
+    backend = CPU_BACKENDS[device]
+    if task not in backend["pipelines"]:
+        raise RuntimeError(f"{backend['name']} motoru '{task}' görevini desteklemiyor")
+
+    pipeline_class = backend["pipelines"][task]
+    if type(base_pipe) is pipeline_class:
+        return base_pipe
+    if base_pipe.vae_encoder is None:
+        raise RuntimeError(f"Dışa aktarılan modelde VAE kodlayıcısı yok, '{task}' görevi çalıştırılamaz")
+
+    shared = {
+        "config": dict(base_pipe.config),
+        "tokenizer": base_pipe.tokenizer,
+        "scheduler": base_pipe.scheduler,
+        "feature_extractor": base_pipe.feature_extractor,
+        "model_save_dir": base_pipe.model_save_dir,
+    }
+    parts = ("text_encoder", "unet", "vae_decoder", "vae_encoder")
+
+    if device == "cpu-onnx":
+        sessions = {f"{part}_session": getattr(base_pipe, part).session for part in parts}
+        return pipeline_class(**sessions, use_io_binding=base_pipe.use_io_binding, **shared)
+
+    # OpenVINO: modeller bir kez derlenir, çıkarım istekleri yeni pipeline'a aktarılır
+    base_pipe.compile()
+    models = {part: getattr(base_pipe, part).model for part in parts}
+    task_pipe = pipeline_class(**models, device=base_pipe._device, ov_config=base_pipe.ov_config, compile=False, **shared)
+    for part in parts:
+        getattr(task_pipe, part).request = getattr(base_pipe, part).request
+    return task_pipe
+
+def make_backend_generator(seed):
+    """CPU motorları torch yerine numpy rastgele sayı üreteci kullanır"""
+    return np.random.RandomState(seed)
@@ -0,0 +1,193 @@
+"""
+Bu modül, "hızlı" kalite modu için DeepCache tarzı UNet özellik önbelleğini uygular.
+
+Ardışık denoising adımlarında UNet'in derin (düşük çözünürlüklü) katmanlarının
+çıktıları çok az değişir. Hızlı modda bu derin özellikler yalnızca her N adımda bir
+tam olarak hesaplanır; aradaki adımlarda yalnızca ilk down bloğu ile son up bloğu
+çalıştırılır ve derin özellikler önbellekten kullanılır.
+"""
+
+import logging
+import threading
+import torch
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Derin özelliklerin kaç adımda bir yeniden hesaplanacağı
+DEFAULT_CACHE_INTERVAL = 3
+
+# Kalite modları: mod adı -> önbellek aralığı (None: kapalı)
+QUALITY_MODES = {
+    "normal": None,
+    "fast": DEFAULT_CACHE_INTERVAL
+}
+
+_install_lock = threading.Lock()
+
+def supports_deepcache(unet):
+    """UNet'in özellik önbelleğiyle çalıştırılıp çalıştırılamayacağını döndürür"""
+    config = getattr(unet, "config", None)
+    if config is None or not hasattr(unet, "down_blocks") or not hasattr(unet, "up_blocks"):
+        return False
+    # Sınıf / ek koşullu (ör. SDXL) UNet'ler, derlenmiş ve CPU offload kancalı modüller desteklenmez
+    if getattr(unet, "class_embedding", None) is not None or getattr(config, "addition_embed_type", None):
+        return False
+    if getattr(unet, "_compiled_call_impl", None) is not None or hasattr(unet, "_hf_hook"):
+        return False
+    return len(unet.down_blocks) > 1 and len(unet.up_blocks) > 1
+
+def _run_block(block, hidden_states, emb, encoder_hidden_states, cross_attention_kwargs, **kwargs):
+    """Down/mid/up bloğunu çapraz dikkat desteğine göre çağırır"""
+    if getattr(block, "has_cross_attention", False):
+        return block(
+            hidden_states=hidden_states,
+            temb=emb,
+            encoder_hidden_states=encoder_hidden_states,
+            cross_attention_kwargs=cross_attention_kwargs,
+            **kwargs
+        )
+    return block(hidden_states=hidden_states, temb=emb, **kwargs)
+
+def _cached_forward(unet, state, sample, timestep, encoder_hidden_states, cross_attention_kwargs=None, return_dict=True, **kwargs):
+    """
+    UNet2DConditionModel.forward'un derin özellikleri önbellekleyen sürümü
+
+    state["step"] her çağrıda artar; derin özellikler her state["interval"] adımda
+    bir hesaplanır.
+    """
+    # Giriş boyutu değişirse (ör. guidance kapandığında veya hi-res iyileştirmede) önbellek geçersizdir
+    compute_deep = (
+        state["step"] % state["interval"] == 0
+        or state.get("deep") is None
+        or state.get("shape") != sample.shape
+    )
+    state["step"] += 1
+
+    # Zaman gömmesi
+    timesteps = timestep
+    if not torch.is_tensor(timesteps):
+        timesteps = torch.tensor([timesteps], device=sample.device)
+    elif timesteps.dim() == 0:
+        timesteps = timesteps[None].to(sample.device)
+    timesteps = timesteps.expand(sample.shape[0])
+    emb = unet.time_embedding(unet.time_proj(timesteps).to(dtype=sample.dtype), kwargs.get("timestep_cond"))
+
+    # Giriş boyutu up-sampler katına bölünmüyorsa up bloklarına hedef boyut verilir
+    upsample_factor = 2 ** unet.num_upsamplers
+    forward_upsample_size = any(size % upsample_factor != 0 for size in sample.shape[-2:])
+
+    # Her adımda: giriş katmanı ve ilk down bloğu
+    sample_shape = sample.shape
+    sample = unet.conv_in(sample)
+    res_samples = (sample,)
+    shallow, res = _run_block(unet.down_blocks[0], sample, emb, encoder_hidden_states, cross_attention_kwargs)
+    res_samples += res
+
+    if compute_deep:
+        deep = shallow
+        deep_res = res_samples
+        for block in unet.down_blocks[1:]:
+            deep, res = _run_block(block, deep, emb, encoder_hidden_states, cross_attention_kwargs)
+            deep_res += res
+
+        if unet.mid_block is not None:
+            deep = _run_block(unet.mid_block, deep, emb, encoder_hidden_states, cross_attention_kwargs)
+
+        for block in unet.up_blocks[:-1]:
+            count = len(block.resnets)
+            res, deep_res = deep_res[-count:], deep_res[:-count]
+            upsample_size = deep_res[-1].shape[2:] if forward_upsample_size else None
+            deep = _run_block(
+                block, deep, emb, encoder_hidden_states, cross_attention_kwargs,
+                res_hidden_states_tuple=res, upsample_size=upsample_size
+            )
+        state["deep"] = deep
+        state["shape"] = sample_shape
+
+    # Her adımda: son up bloğu (ilk down bloğunun kalıntılarıyla) ve çıkış katmanı
+    last_block = unet.up_blocks[-1]
+    sample = _run_block(
+        last_block, state["deep"], emb, encoder_hidden_states, cross_attention_kwargs,
+        res_hidden_states_tuple=res_samples[:len(last_block.resnets)]
+    )
+    if unet.conv_norm_out is not None:
+        sample = unet.conv_act(unet.conv_norm_out(sample))
+    sample = unet.conv_out(sample)
+
+    if not return_dict:
+        return (sample,)
+    try:
+        from diffusers.models.unets.unet_2d_condition import UNet2DConditionOutput
+    except ImportError:
+        from diffusers.models.unet_2d_condition import UNet2DConditionOutput
+    return UNet2DConditionOutput(sample=sample)
+
+def _install(unet):
+    """UNet'e iş parçacığı bazında yönlendiren forward'u bir kez kurar"""
+    states = unet.__dict__.get("_imggenai_deepcache")
+    if states is not None:
+        return states
+
+    states = {}
+    original_forward = unet.forward
+
+    def forward(sample, timestep, encoder_hidden_states, *args, **kwargs):
+        # Yalnızca hızlı modu açan iş parçacığı önbellekli yolu kullanır
+        state = states.get(threading.get_ident())
+        if state is None or args:
+            return original_forward(sample, timestep, encoder_hidden_states, *args, **kwargs)
+        return _cached_forward(unet, state, sample, timestep, encoder_hidden_states, **kwargs)
+
+    unet._imggenai_deepcache = states
+    # Örnek düzeyinde başka bir forward varsa (kancalar) kaldırırken geri yüklenir
+    unet._imggenai_original_forward = unet.__dict__.get("forward")
+    unet.forward = forward
+    return states
+
+def _uninstall(unet):
+    """Hiçbir iş parçacığı kullanmıyorsa özgün forward'u geri yükler"""
+    states = unet.__dict__.get("_imggenai_deepcache")
+    if states is None or states:
+        return
+    original_forward = unet._imggenai_original_forward
+    del unet._imggenai_deepcache
+    del unet._imggenai_original_forward
+    if original_forward is not None:
+        unet.forward = original_forward
+    else:
+        del unet.forward
+
+@contextmanager
+def deepcache(pipe, interval=DEFAULT_CACHE_INTERVAL):
+    """
+    Blok içindeki pipeline çağrılarında UNet derin özellik önbelleğini etkinleştirir
+
+    Args:
+        pipe: Torch tabanlı diffusers pipeline'ı
+        interval: Derin özelliklerin kaç adımda bir yeniden hesaplanacağı (None/1: kapalı)
+
+    Yields:
+        bool: Önbellek etkinse True
+    """
+    unet = getattr(pipe, "unet", None)
+    if not interval or interval <= 1 or not isinstance(unet, torch.nn.Module):
+        yield False
+        return
+    if not supports_deepcache(unet):
+        logger.warning("Bu model hızlı modu desteklemiyor, normal modda çalışılacak")
+        yield False
+        return
+
+    thread_id = threading.get_ident()
+    with _install_lock:
+        states = _install(unet)
+        states[thread_id] = {"step": 0, "interval": interval, "deep": None}
+    try:
+        yield True
+    finally:
+        with _install_lock:
+            state = states.pop(thread_id, None)
+            _uninstall(unet)
+        if state:
+            logger.info(f"Hızlı mod: {state['step']} adımın {(state['step'] + interval - 1) // interval} tanesinde tam UNet hesaplandı")
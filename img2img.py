@@ -1,8 +1,16 @@
+import gc
 import torch
 import time
 import logging
+from collections import OrderedDict
 from PIL import Image
-from model_manager import load_img2img_model
+from model_manager import pipeline_session, apply_lora, get_recommended_steps, get_request_device, encode_prompts, configure_vae_memory, encode_init_image
+from pipeline_callbacks import (
+    StepCallbackChain, make_cancellation_callback, make_timing_callback, GenerationCancelled,
+    guidance_cutoff_step, make_guidance_cutoff_callback, summarize_guidance_cutoff
+)
+from utils import PeakMemoryMonitor
+from deepcache import deepcache, QUALITY_MODES
 
 # Loglama ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,75 +21,188 @@ def generate_image_from_image(
     prompt, 
     strength=0.8, 
     guidance_scale=7.5, 
-    num_steps=50,
+    num_steps=None,
     model_id=None,
     negative_prompt="",
-    low_memory=False
+    low_memory=False,
+    scheduler=None,
+    cancel_token=None,
+    quality="normal",
+    token_merging=None,
+    guidance_cutoff=None
 ):
     """
     Var olan bir görselden yeni bir görsel oluşturur (img2img)
     
     Args:
         init_image (PIL.Image): Başlangıç görseli
-        prompt (str): İstenen değişiklik için metin açıklaması
-        strength (float): Değişim miktarı (0.0-1.0 arası, 1.0 tamamen yeni görsele yaklaşır)
+        prompt (str | list): İstenen değişiklik için metin açıklaması (liste ise her biri için bir varyasyon)
+        strength (float | list): Değişim miktarı (0.0-1.0 arası, 1.0 tamamen yeni görsele yaklaşır);
+            liste ise prompt listesiyle sıra sıra eşleşir, tek değer tüm varyasyonlara uygulanır
         guidance_scale (float): Prompt'a ne kadar sadık olunacağı (CFG)
-        num_steps (int): Diffusion adımı sayısı
+        num_steps (int): Diffusion adımı sayısı (None ise örnekleyici için önerilen değer)
         model_id (str): Kullanılacak model ID'si
         negative_prompt (str): İstenmeyen özelliklerin belirtildiği metin
         low_memory (bool): Düşük bellek modu aktif mi?
+        scheduler (str): Örnekleyici adı (None ise varsayılan)
+        cancel_token (CancellationToken): İptal/süre sınırı belirteci (her adımda kontrol edilir)
+        quality (str): "normal" veya "fast" (UNet derin özellikleri adımlar arasında yeniden kullanılır)
+        token_merging (float): Token birleştirme oranı (None ise model varsayılanı, 0: kapalı)
+        guidance_cutoff (float): Guidance'ın uygulanacağı adım oranı (örn. 0.7: son %30 adım guidance'sız; None/1: kapalı)
         
     Returns:
-        PIL.Image: Oluşturulan görsel
+        PIL.Image: Oluşturulan görsel (prompt veya strength liste ise varyasyon sırasıyla görsel listesi;
+            üretilemeyen varyasyonlar None)
+        
+    Raises:
+        GenerationCancelled: Dönüştürme iptal edildiğinde veya süresi dolduğunda
     """
+    # Tek görsel isteği mi, varyasyon listesi mi?
+    single = isinstance(prompt, str) and not isinstance(strength, (list, tuple))
+    prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+    strengths = list(strength) if isinstance(strength, (list, tuple)) else [strength]
+    
     try:
         start_time = time.time()
-        logger.info(f"Görsel dönüştürülüyor: '{prompt}'")
         
-        # Cihaz belirleme
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Tek değerleri varyasyon sayısına genişlet
+        count = max(len(prompts), len(strengths))
+        if len(prompts) == 1:
+            prompts = prompts * count
+        if len(strengths) == 1:
+            strengths = strengths * count
+        if len(prompts) != len(strengths) or not prompts:
+            logger.error(f"Prompt sayısı ({len(prompts)}) değişim miktarı sayısıyla ({len(strengths)}) eşleşmiyor")
+            return None if single else []
+        
+        if single:
+            logger.info(f"Görsel dönüştürülüyor: '{prompt}'")
+        else:
+            logger.info(f"Görsel dönüştürülüyor: {len(prompts)} varyasyon ({len(set(strengths))} farklı değişim miktarı)")
+        
+        # Cihaz belirleme - GPU yoksa CPU (veya seçili CPU motoru) kullan
+        device = get_request_device()
+        
+        if cancel_token:
+            cancel_token.check()
         
-        # Img2img pipeline'ı yükle
-        pipe = load_img2img_model(model_id, device, safety_checker=True, low_memory=low_memory)
+        # Adım sayısı verilmemişse örnekleyicinin önerdiği değeri kullan
+        if num_steps is None:
+            num_steps = get_recommended_steps(scheduler)
         
-        if pipe is None:
-            logger.error("Img2img modeli yüklenemedi")
-            return None
+        # Aynı değişim miktarındaki varyasyonlar tek bir toplu denoising geçişinde üretilir
+        groups = OrderedDict()
+        for index, value in enumerate(strengths):
+            groups.setdefault(value, []).append(index)
         
-        # Görseli oluştur
-        with torch.inference_mode():
-            # GPU varsa ve low_memory modundaysa önbellek temizle
-            if device == "cuda" and low_memory:
-                torch.cuda.empty_cache()
+        images = [None] * len(prompts)
+        
+        # Img2img pipeline'ı yükle; model istek boyunca bu isteğe ayrılır (örnekleyici, LoRA ve
+        # bellek modları dönüştürme sırasında başka bir istek tarafından değiştirilmez)
+        with pipeline_session("img2img", model_id, device, low_memory=low_memory, scheduler=scheduler, token_merging=token_merging) as pipe:
+            if pipe is None:
+                logger.error("Img2img modeli yüklenemedi")
+                return None if single else []
+            
+            # Paylaşılan UNet üzerinde txt2img isteklerinden kalan LoRA'ları kapat (model kilidi tutulurken;
+            # etkin LoRA yoksa ağırlıklara dokunulmaz)
+            try:
+                apply_lora(pipe, None)
+            except Exception as e:
+                logger.error(f"LoRA kapatma hatası: {e}")
+            
+            # Büyük görsellerde VAE'yi döşemeli/dilimli çalıştır (kodlama ve çözümleme)
+            configure_vae_memory(pipe, *init_image.size)
             
-            # Oluşturma işlemi
-            result = pipe(
-                prompt=prompt,
-                image=init_image,
-                strength=strength,
-                guidance_scale=guidance_scale,
-                negative_prompt=negative_prompt,
-                num_inference_steps=num_steps
-            )
+            # Görselleri oluştur (tepe bellek ölçülür)
+            memory_monitor = PeakMemoryMonitor(device)
+            with memory_monitor, torch.inference_mode():
+                # GPU varsa ve low_memory modundaysa önbellek temizle
+                if device == "cuda" and low_memory:
+                    torch.cuda.empty_cache()
+                
+                # Başlangıç latent'ini önbellekten al (aynı görselde VAE kodlayıcısı tekrar çalışmaz)
+                init_latents = encode_init_image(pipe, init_image)
+                
+                for group_strength, indices in groups.items():
+                    group_prompts = [prompts[index] for index in indices]
+                    
+                    # Adım sonu geri çağrıları (iptal kontrolü)
+                    callbacks = StepCallbackChain()
+                    if cancel_token:
+                        cancel_token.check()
+                        callbacks.add(make_cancellation_callback(cancel_token))
+                    
+                    # Guidance kesme: strength ile kısalan gerçek adım sayısı üzerinden hesaplanır
+                    denoising_steps = min(int(num_steps * group_strength), num_steps)
+                    cutoff_step = guidance_cutoff_step(denoising_steps, guidance_cutoff) if guidance_scale > 1 else None
+                    step_times = []
+                    if cutoff_step:
+                        callbacks.add(make_timing_callback(step_times))
+                        callbacks.add(make_guidance_cutoff_callback(cutoff_step), ["prompt_embeds"])
+                    
+                    # Prompt embedding'leri önbellekten al (CPU motorlarında metin doğrudan verilir)
+                    prompt_embeds, negative_prompt_embeds = encode_prompts(
+                        pipe, group_prompts, [negative_prompt or ""] * len(group_prompts) if guidance_scale > 1 else None
+                    )
+                    if prompt_embeds is not None:
+                        prompt_args = {"prompt_embeds": prompt_embeds, "negative_prompt_embeds": negative_prompt_embeds}
+                    else:
+                        prompt_args = {"prompt": group_prompts, "negative_prompt": [negative_prompt] * len(group_prompts)}
+                    
+                    # Ortak latent her varyasyon için çoğaltılır
+                    if init_latents is not None:
+                        image = init_latents.repeat(len(group_prompts), 1, 1, 1)
+                    else:
+                        image = [init_image] * len(group_prompts)
+                    
+                    # Oluşturma işlemi (hızlı modda UNet derin özellikleri geçiş içinde önbelleklenir)
+                    with deepcache(pipe, QUALITY_MODES.get(quality)):
+                        result = pipe(
+                            **prompt_args,
+                            image=image,
+                            strength=group_strength,
+                            guidance_scale=guidance_scale,
+                            num_inference_steps=num_steps,
+                            **callbacks.as_pipeline_kwargs(pipe)
+                        )
+                    
+                    if cutoff_step:
+                        logger.info(f"Guidance kesme ({cutoff_step}/{denoising_steps} adım): {summarize_guidance_cutoff(step_times, cutoff_step)}")
+                    
+                    # NSFW kontrolü
+                    if hasattr(result, "nsfw_content_detected") and result.nsfw_content_detected is not None:
+                        if any(result.nsfw_content_detected):
+                            logger.warning("NSFW içerik tespit edildi, görsel blurlanabilir")
+                    
+                    if result and hasattr(result, "images"):
+                        for position, index in enumerate(indices):
+                            if position < len(result.images):
+                                images[index] = result.images[position]
         
         elapsed_time = time.time() - start_time
-        logger.info(f"Görsel dönüştürme tamamlandı: {elapsed_time:.2f} saniye")
-        
-        # NSFW kontrolü
-        if hasattr(result, "nsfw_content_detected") and result.nsfw_content_detected is not None:
-            if any(result.nsfw_content_detected):
-                logger.warning("NSFW içerik tespit edildi, görsel blurlanabilir")
+        logger.info(
+            f"Görsel dönüştürme tamamlandı: {len(images)} görsel, {len(groups)} toplu geçiş, "
+            f"{elapsed_time:.2f} saniye, tepe bellek: {memory_monitor.summary()}"
+        )
         
         # Sonucu döndür
-        if result and hasattr(result, "images") and len(result.images) > 0:
-            return result.images[0]
-        else:
+        if not any(images):
             logger.warning("Görsel dönüştürme başarısız oldu, sonuç bulunamadı")
-            return None
+        return images[0] if single else images
             
+    except GenerationCancelled as e:
+        reason = e.reason
     except Exception as e:
         logger.error(f"Görsel dönüştürülürken hata: {e}", exc_info=True)
-        return None
+        return None if single else []
+    
+    # İptal: ara tensörler traceback ile birlikte bırakıldıktan sonra belleği temizle
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    gc.collect()
+    logger.warning(f"Görsel dönüştürme durduruldu ({reason}): {time.time() - start_time:.2f} saniye")
+    raise GenerationCancelled(reason)
 
 if __name__ == "__main__":
     # Test
@@ -0,0 +1,94 @@
+"""
+Bu modül, img2img başlangıç görsellerinin VAE ile kodlanmış latent'lerini LRU
+önbellekte saklar.
+
+Aynı görsel (ör. gelişmiş düzenleme iş akışındaki temel görsel veya farklı
+prompt'larla yeniden denenen yükleme) tekrar dönüştürüldüğünde ön işleme ve VAE
+kodlayıcısı çalıştırılmaz; önbellekteki latent doğrudan pipeline'a verilir.
+"""
+
+import hashlib
+import logging
+import threading
+import torch
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Önbellekte tutulacak en fazla latent sayısı (512x512 için her biri ~32-64 KB)
+DEFAULT_MAX_ENTRIES = 64
+
+def hash_image(image):
+    """Görselin piksel içeriğinden kararlı bir özet üretir"""
+    image = image.convert("RGB")
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image.size}".encode())
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+class InitLatentCache:
+    """(görsel özeti, boyut, VAE özeti, cihaz, veri tipi, döşemeli mod) anahtarlı LRU latent önbelleği"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def encode(self, pipe, image, vae_fingerprint):
+        """
+        Görselin ölçeklenmiş latent'ini önbellekten veya VAE kodlayıcısıyla üretir
+
+        Latent, dağılımın ortalamasından (rastgele örnekleme olmadan) alınır; böylece
+        önbellekten gelen ve yeni hesaplanan latent aynıdır.
+
+        Args:
+            pipe: Torch tabanlı diffusers img2img pipeline'ı (image_processor ve vae içermeli)
+            image (PIL.Image): Başlangıç görseli
+            vae_fingerprint (str): VAE ağırlıklarının içerik özeti
+
+        Returns:
+            torch.Tensor: [1, 4, h/8, w/8] latent
+        """
+        vae = pipe.vae
+        device = getattr(pipe, "_execution_device", pipe.device)
+        # Döşemeli kodlama sayısal olarak farklı latent üretir, mod anahtara girer
+        tiled = bool(getattr(vae, "use_tiling", False))
+        key = (hash_image(image), image.size, vae_fingerprint, str(device), str(vae.dtype), tiled)
+
+        with self.lock:
+            latents = self.entries.get(key)
+            if latents is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+        if latents is not None:
+            logger.info(f"Başlangıç latent'i önbellekten alındı ({image.size[0]}x{image.size[1]}), VAE kodlayıcısı atlandı")
+            return latents
+
+        with torch.inference_mode():
+            pixels = pipe.image_processor.preprocess(image.convert("RGB"))
+            pixels = pixels.to(device=device, dtype=vae.dtype)
+            latents = vae.encode(pixels).latent_dist.mode() * vae.config.scaling_factor
+
+        with self.lock:
+            self.stats["misses"] += 1
+            self.entries[key] = latents
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        logger.debug(f"Başlangıç latent'i kodlandı ve önbelleğe eklendi ({image.size[0]}x{image.size[1]})")
+        return latents
+
+    def invalidate(self, vae_fingerprint):
+        """VAE'si artık kullanılmayan latent'leri siler"""
+        with self.lock:
+            for key in [key for key in self.entries if key[2] == vae_fingerprint]:
+                del self.entries[key]
+
+    def get_stats(self):
+        """İsabet oranı ve önbellek boyutunu döndürür"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
@@ -1,8 +1,10 @@
 import gradio as gr
 import argparse
 import os
+import queue
 import logging
-from txt2img import generate_image_from_text
+import threading
+from batching import generate_image, configure_batching
 from img2img import generate_image_from_image
 from img2vid import generate_video_from_images
 from workflow import run_workflow
@@ -11,13 +13,125 @@ from model_manager import (
     list_available_models, 
     list_available_loras, 
     get_prompt_suggestions,
-    download_all_models
+    download_all_models,
+    preload_models,
+    get_readiness,
+    list_available_schedulers,
+    get_recommended_steps,
+    set_cpu_backend,
+    set_default_quantization,
+    set_compile_mode,
+    set_cpu_offload,
+    set_token_merging
 )
+from cpu_backends import CPU_BACKENDS
+from result_cache import result_cache
+from pipeline_callbacks import CancellationToken, GenerationCancelled
 
 # Loglama ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def parse_resolutions(value):
+    """"512x512,768x768" biçimindeki çözünürlük listesini ayrıştırır"""
+    resolutions = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        width, height = item.lower().split("x")
+        resolutions.append((int(width), int(height)))
+    return resolutions
+
+def format_readiness(readiness):
+    """Hazır olma durumunu arayüz için metne dönüştürür"""
+    if readiness["state"] == "ready":
+        text = "### ✅ Sunucu hazır"
+    elif readiness["state"] == "loading":
+        text = "### ⏳ Modeller ön yükleniyor..."
+    else:
+        text = f"### ❌ Ön yükleme hatası: {readiness['error']}"
+    
+    if readiness["models"]:
+        text += "\n" + "\n".join(f"- {model_id}: {state}" for model_id, state in readiness["models"].items())
+    return text
+
+def register_readiness_route(app):
+    """Yük dengeleyici için /ready HTTP uç noktasını ekler (hazır değilse 503 döner)"""
+    from fastapi.responses import JSONResponse
+    
+    def ready():
+        readiness = get_readiness()
+        return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+    
+    server_app = app.server_app
+    server_app.add_api_route("/ready", ready, methods=["GET"])
+    # Gradio'nun genel yollarından önce eşleşmesi için başa taşı
+    server_app.router.routes.insert(0, server_app.router.routes.pop())
+
+def stream_generation(target, cancel_token, updates, idle):
+    """
+    Üretimi ayrı bir iş parçacığında çalıştırır ve updates kuyruğundaki ara çıktıları iletir
+    
+    Kuyrukta bir şey yoksa saniyede bir idle değeri üretilir; böylece kullanıcı durdurduğunda
+    veya sayfadan ayrıldığında generator kapanır ve üretim iptal edilir.
+    
+    Returns:
+        target'ın dönüş değeri (yield from ile alınır)
+    """
+    done = object()
+    outcome = {}
+    
+    def run():
+        try:
+            outcome["result"] = target()
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            updates.put(done)
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                item = updates.get(timeout=1.0)
+            except queue.Empty:
+                yield idle
+                continue
+            if item is done:
+                break
+            yield item
+    finally:
+        # Kullanıcı durdurduysa veya ayrıldıysa çalışan üretimi iptal et
+        if thread.is_alive():
+            cancel_token.cancel()
+    
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+def format_cancellation(error):
+    """İptal nedenini kullanıcıya gösterilecek metne dönüştürür"""
+    if error.reason == "timeout":
+        return "Süre sınırı aşıldı, işlem durduruldu."
+    return "İşlem durduruldu."
+
+def enable_queue(app):
+    """Önizleme akışı için kuyruğu açar; olaylar varsayılan olarak tek tek çalışır"""
+    app.queue()
+
+def generate_concurrency(max_batch_size):
+    """
+    Görsel oluşturma olayının eşzamanlılık ayarını döndürür
+    
+    Eşzamanlı istekler toplu üretimde birleşebilsin diye yalnızca bu olay paralel
+    çalışır. Gradio 3.x olay bazında sınır desteklemez; orada istekler sırayla işlenir.
+    """
+    if int(gr.__version__.split(".")[0]) < 4:
+        return {}
+    return {"concurrency_limit": max_batch_size}
+
 def main():
     # Komut satırı argümanlarını işle
     parser = argparse.ArgumentParser(description="AI Görsel Oluşturma")
@@ -26,6 +140,16 @@ def main():
     parser.add_argument("--debug", action="store_true", help="Hata ayıklama modunu etkinleştir")
     parser.add_argument("--low-memory", action="store_true", help="Düşük bellek modu")
     parser.add_argument("--download-models", action="store_true", help="Tüm modelleri indir")
+    parser.add_argument("--cpu-backend", choices=list(CPU_BACKENDS.keys()), help="GPU yoksa kullanılacak CPU motoru (ONNX Runtime / OpenVINO)")
+    parser.add_argument("--quantize", choices=["int8"], help="CPU üzerinde text encoder ve UNet için dinamik int8 kuantizasyon")
+    parser.add_argument("--compile", action="store_true", help="UNet ve VAE için torch.compile hızlandırması (derlemeler diskte saklanır)")
+    parser.add_argument("--token-merging", type=float, default=None, metavar="ORAN", help="Yüksek çözünürlükte self-attention hızlandırması için token birleştirme oranı (örn: 0.3, tomesd gerekir)")
+    parser.add_argument("--batch-wait", type=float, default=50, help="Eşzamanlı istekleri birleştirmek için en fazla bekleme süresi (ms)")
+    parser.add_argument("--max-batch-size", type=int, default=4, help="Tek seferde birleştirilecek en fazla istek sayısı (1: kapalı)")
+    parser.add_argument("--timeout", type=float, default=None, help="İstek başına en fazla üretim süresi (saniye), aşılırsa üretim durdurulur")
+    parser.add_argument("--no-result-cache", action="store_true", help="Aynı parametre ve tohumla üretilmiş görselleri önbellekten sunma")
+    parser.add_argument("--preload", nargs="*", metavar="MODEL_ID", help="Başlangıçta modelleri arka planda yükle ve ısındır (model verilmezse varsayılan model)")
+    parser.add_argument("--warmup-sizes", type=parse_resolutions, default="512x512", help="Isınma üretimi çözünürlükleri (örn: 512x512,768x768)")
     args = parser.parse_args()
     
     # Debug modu
@@ -40,6 +164,42 @@ def main():
         download_all_models()
         logger.info("Model indirme tamamlandı")
     
+    # GPU olmayan sistemler için alternatif CPU motoru
+    if args.cpu_backend:
+        set_cpu_backend(args.cpu_backend)
+    
+    # CPU için int8 kuantizasyon
+    if args.quantize:
+        set_default_quantization(args.quantize)
+    
+    # Düşük bellek modu: CPU offload tüm modellerde ve isteklerde (iş akışları dahil) açık kalır
+    if args.low_memory:
+        set_cpu_offload(True)
+    
+    # torch.compile hızlandırması
+    if args.compile:
+        set_compile_mode(True)
+    
+    # Token birleştirme (ToMe) hızlandırması
+    if args.token_merging is not None:
+        set_token_merging(args.token_merging)
+    
+    # Sonuç önbelleği
+    if args.no_result_cache:
+        result_cache.enabled = False
+    
+    # Eşzamanlı istekler için dinamik toplu üretim
+    configure_batching(max_wait=args.batch_wait / 1000, max_batch_size=args.max_batch_size)
+    
+    # Modelleri arka planda ön yükle
+    if args.preload is not None:
+        logger.info("Modeller arka planda ön yükleniyor...")
+        preload_models(
+            model_ids=args.preload or None,
+            resolutions=args.warmup_sizes,
+            low_memory=args.low_memory
+        )
+    
     # Sistem bilgisini kontrol et ve göster
     system_info = check_system_info()
     
@@ -53,6 +213,14 @@ def main():
     # LoRA seçeneklerini oluştur
     lora_choices = [("Yok", None)] + [(lora_info["name"], lora_id) for lora_id, lora_info in loras.items()]
     
+    # Örnekleyici seçeneklerini oluştur
+    schedulers = list_available_schedulers()
+    scheduler_choices = [(f"{info['name']} ({info['steps']} adım)", name) for name, info in schedulers.items()]
+    default_scheduler = next((name for name, info in schedulers.items() if info.get("default")), scheduler_choices[0][1])
+    
+    # Kalite modu seçenekleri (hızlı: önizleme kalitesinde, ~1.5-2x daha hızlı)
+    quality_choices = [("Normal", "normal"), ("Hızlı (önizleme kalitesi)", "fast")]
+    
     with gr.Blocks(title="AI Görsel Oluşturma") as app:
         gr.Markdown("# 🎨 AI Görsel Oluşturma Aracı")
         
@@ -69,6 +237,24 @@ def main():
         if args.low_memory:
             gr.Markdown("### 🔄 Düşük Bellek Modu Aktif: Daha yavaş işlem, daha az bellek kullanımı")
         
+        # Ön yükleme / hazır olma durumu
+        with gr.Row():
+            readiness_status = gr.Markdown(format_readiness(get_readiness()))
+            readiness_json = gr.JSON(visible=False)
+            readiness_btn = gr.Button("Durumu Yenile")
+        
+        def readiness_wrapper():
+            readiness = get_readiness()
+            return format_readiness(readiness), readiness
+        
+        readiness_btn.click(
+            fn=readiness_wrapper,
+            inputs=None,
+            outputs=[readiness_status, readiness_json],
+            api_name="readiness"
+        )
+        app.load(fn=readiness_wrapper, inputs=None, outputs=[readiness_status, readiness_json])
+        
         with gr.Tab("Metin → Görsel"):
             with gr.Row():
                 with gr.Column():
@@ -112,15 +298,43 @@ def main():
                         step=0.5
                     )
                     
+                    scheduler_dropdown = gr.Dropdown(
+                        choices=scheduler_choices,
+                        value=default_scheduler,
+                        label="Örnekleyici (Scheduler)"
+                    )
+                    
                     num_steps = gr.Slider(
                         label="Diffusion Adımları", 
-                        minimum=10, 
+                        minimum=1, 
                         maximum=100, 
-                        value=50 if not args.low_memory else 30, 
+                        value=get_recommended_steps(default_scheduler), 
                         step=1
                     )
                     
-                    generate_btn = gr.Button("Görsel Oluştur", variant="primary")
+                    quality_dropdown = gr.Dropdown(
+                        choices=quality_choices,
+                        value="normal",
+                        label="Kalite Modu"
+                    )
+                    
+                    guidance_cutoff = gr.Slider(
+                        label="Guidance Kesme (adım oranı, 1: kapalı)",
+                        minimum=0.5,
+                        maximum=1.0,
+                        value=1.0,
+                        step=0.05
+                    )
+                    
+                    seed_input = gr.Number(
+                        label="Tohum (-1: rastgele)",
+                        value=-1,
+                        precision=0
+                    )
+                    
+                    with gr.Row():
+                        generate_btn = gr.Button("Görsel Oluştur", variant="primary")
+                        generate_stop_btn = gr.Button("Durdur")
                     
                 with gr.Column():
                     image_output = gr.Image(label="Oluşturulan Görsel")
@@ -150,43 +364,74 @@ def main():
                 label="Öneri Promptlar"
             )
 
-            # txt2img işlemi için fonksiyon
-            def generate_wrapper(prompt, guidance, steps, model_id, lora_id):
-                output_status_value = "Görsel oluşturuluyor... Lütfen bekleyin."
+            # Örnekleyici değişince önerilen adım sayısını ayarla
+            scheduler_dropdown.change(
+                fn=lambda name: gr.update(value=get_recommended_steps(name)),
+                inputs=[scheduler_dropdown],
+                outputs=[num_steps]
+            )
+            
+            # txt2img işlemi için fonksiyon (ara adım önizlemelerini akış olarak gönderir)
+            def generate_wrapper(prompt, guidance, steps, model_id, lora_id, scheduler, seed, quality, cutoff):
+                # Kullanıcıya işlem başladığını haber ver
+                logger.info(f"'{prompt}' için görsel oluşturuluyor (Model: {model_id}, LoRA: {lora_id if lora_id else 'Yok'})")
+                yield None, "Görsel oluşturuluyor... Lütfen bekleyin."
+                
+                cancel_token = CancellationToken(timeout=args.timeout)
+                previews = queue.Queue()
+                
                 try:
-                    # Kullanıcıya işlem başladığını haber ver
-                    logger.info(f"'{prompt}' için görsel oluşturuluyor (Model: {model_id}, LoRA: {lora_id if lora_id else 'Yok'})")
-                    
-                    # Görseli oluştur
-                    image = generate_image_from_text(
-                        prompt=prompt, 
-                        guidance_scale=guidance, 
-                        num_steps=steps,
-                        model_id=model_id,
-                        lora_id=lora_id,
-                        low_memory=args.low_memory,
-                        debug=args.debug
+                    # Görseli oluştur (eşzamanlı uyumlu isteklerle birleştirilebilir), önizlemeleri aktar
+                    image = yield from stream_generation(
+                        lambda: generate_image(
+                            prompt=prompt, 
+                            seed=None if seed is None or seed < 0 else int(seed),
+                            guidance_scale=guidance, 
+                            num_steps=steps,
+                            model_id=model_id,
+                            lora_id=lora_id,
+                            low_memory=args.low_memory,
+                            debug=args.debug,
+                            scheduler=scheduler,
+                            quality=quality,
+                            guidance_cutoff=cutoff,
+                            preview_callback=lambda step, total, preview: previews.put(
+                                (preview, f"Görsel oluşturuluyor... Adım {step}/{total}")
+                            ),
+                            cancel_token=cancel_token
+                        ),
+                        cancel_token,
+                        previews,
+                        idle=(gr.update(), gr.update())
                     )
-                    
-                    if image:
-                        output_status_value = "Görsel başarıyla oluşturuldu!"
-                        logger.info("Görsel başarıyla oluşturuldu")
-                    else:
-                        output_status_value = "Görsel oluşturulamadı!"
-                        logger.error("Görsel oluşturma başarısız")
-                    
-                    return image, output_status_value
+                except GenerationCancelled as e:
+                    logger.info(f"Görsel oluşturma durduruldu: {e}")
+                    yield None, format_cancellation(e)
+                    return
                 except Exception as e:
                     logger.error(f"Görsel oluşturma hatası: {e}")
-                    output_status_value = f"Hata: {str(e)}"
-                    return None, output_status_value
+                    yield None, f"Hata: {str(e)}"
+                    return
+                
+                if image:
+                    output_status_value = f"Görsel başarıyla oluşturuldu! (Tohum: {image.info.get('seed')})"
+                    logger.info("Görsel başarıyla oluşturuldu")
+                else:
+                    output_status_value = "Görsel oluşturulamadı!"
+                    logger.error("Görsel oluşturma başarısız")
+                
+                yield image, output_status_value
             
             # Görsel oluşturma butonunun tıklanma olayı
-            generate_btn.click(
+            generate_event = generate_btn.click(
                 fn=generate_wrapper,
-                inputs=[text_input, prompt_guidance, num_steps, model_dropdown, lora_dropdown],
-                outputs=[image_output, output_status]
+                inputs=[text_input, prompt_guidance, num_steps, model_dropdown, lora_dropdown, scheduler_dropdown, seed_input, quality_dropdown, guidance_cutoff],
+                outputs=[image_output, output_status],
+                **generate_concurrency(args.max_batch_size)
             )
+            
+            # Durdur: generator kapanır ve çalışan üretim bir sonraki adımda iptal edilir
+            generate_stop_btn.click(fn=None, inputs=None, outputs=None, cancels=[generate_event])
         
         with gr.Tab("Görsel → Görsel"):
             with gr.Row():
@@ -201,27 +446,49 @@ def main():
                     source_image = gr.Image(label="Kaynak Görsel", type="pil")
                     img2img_prompt = gr.Textbox(label="İstediğiniz değişiklik", lines=2)
                     strength = gr.Slider(label="Değişim Miktarı", minimum=0.1, maximum=1.0, value=0.8, step=0.05)
-                    img2img_steps = gr.Slider(label="Diffusion Adımları", minimum=10, maximum=100, value=30, step=1)
-                    img2img_btn = gr.Button("Dönüştür")
+                    img2img_scheduler = gr.Dropdown(choices=scheduler_choices, value=default_scheduler, label="Örnekleyici (Scheduler)")
+                    img2img_steps = gr.Slider(label="Diffusion Adımları", minimum=1, maximum=100, value=30, step=1)
+                    img2img_quality = gr.Dropdown(choices=quality_choices, value="normal", label="Kalite Modu")
+                    img2img_cutoff = gr.Slider(label="Guidance Kesme (adım oranı, 1: kapalı)", minimum=0.5, maximum=1.0, value=1.0, step=0.05)
+                    with gr.Row():
+                        img2img_btn = gr.Button("Dönüştür")
+                        img2img_stop_btn = gr.Button("Durdur")
                 with gr.Column():
                     img2img_output = gr.Image(label="Dönüştürülmüş Görsel")
                     img2img_status = gr.Markdown("*Görseli dönüştürmek için önce kaynak görsel seçin ve istediğiniz değişikliği yazın.*")
             
+            img2img_scheduler.change(
+                fn=lambda name: gr.update(value=get_recommended_steps(name)),
+                inputs=[img2img_scheduler],
+                outputs=[img2img_steps]
+            )
+            
             # img2img işlemi için fonksiyon
-            def img2img_wrapper(init_image, prompt, strength, steps, model_id):
+            def img2img_wrapper(init_image, prompt, strength, steps, model_id, scheduler, quality, cutoff):
                 if init_image is None:
-                    return None, "Lütfen bir kaynak görsel seçin!"
+                    yield None, "Lütfen bir kaynak görsel seçin!"
+                    return
                 
-                status_value = "Görsel dönüştürülüyor... Lütfen bekleyin."
+                yield None, "Görsel dönüştürülüyor... Lütfen bekleyin."
+                cancel_token = CancellationToken(timeout=args.timeout)
                 try:
                     # Görseli dönüştür
-                    image = generate_image_from_image(
-                        init_image=init_image,
-                        prompt=prompt,
-                        strength=strength,
-                        num_steps=steps,
-                        model_id=model_id,
-                        low_memory=args.low_memory
+                    image = yield from stream_generation(
+                        lambda: generate_image_from_image(
+                            init_image=init_image,
+                            prompt=prompt,
+                            strength=strength,
+                            num_steps=steps,
+                            model_id=model_id,
+                            low_memory=args.low_memory,
+                            scheduler=scheduler,
+                            quality=quality,
+                            guidance_cutoff=cutoff,
+                            cancel_token=cancel_token
+                        ),
+                        cancel_token,
+                        queue.Queue(),
+                        idle=(gr.update(), gr.update())
                     )
                     
                     if image:
@@ -229,16 +496,21 @@ def main():
                     else:
                         status_value = "Görsel dönüştürülemedi!"
                     
-                    return image, status_value
+                    yield image, status_value
+                except GenerationCancelled as e:
+                    logger.info(f"Görsel dönüştürme durduruldu: {e}")
+                    yield None, format_cancellation(e)
                 except Exception as e:
                     logger.error(f"Görsel dönüştürme hatası: {e}")
-                    return None, f"Hata: {str(e)}"
+                    yield None, f"Hata: {str(e)}"
             
-            img2img_btn.click(
+            img2img_event = img2img_btn.click(
                 fn=img2img_wrapper,
-                inputs=[source_image, img2img_prompt, strength, img2img_steps, img2img_model_dropdown],
+                inputs=[source_image, img2img_prompt, strength, img2img_steps, img2img_model_dropdown, img2img_scheduler, img2img_quality, img2img_cutoff],
                 outputs=[img2img_output, img2img_status]
             )
+            
+            img2img_stop_btn.click(fn=None, inputs=None, outputs=None, cancels=[img2img_event])
         
         with gr.Tab("Görsel → Video"):
             with gr.Row():
@@ -358,13 +630,21 @@ def main():
         print(f"Modeller: {list(models.keys())}")
         print(f"LoRA'lar: {list(loras.keys())}")
     
+    # Önizleme akışı kuyruk gerektirir
+    enable_queue(app)
+    
     # Uygulamayı başlat
     app.launch(
         server_name="0.0.0.0", 
         server_port=args.port, 
         share=args.share,
-        debug=args.debug
+        show_error=args.debug,
+        prevent_thread_lock=True
     )
+    
+    # Hazır olma uç noktasını ekle ve sunucuyu açık tut
+    register_readiness_route(app)
+    app.block_thread()
 
 if __name__ == "__main__":
     main()
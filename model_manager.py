@@ -1,17 +1,38 @@
 import os
+import gc
+import time
+import hashlib
+import copy
 import torch
+import diffusers
 import logging
 import json
 import requests
 import shutil
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from diffusers import (
     StableDiffusionPipeline, 
     StableDiffusionImg2ImgPipeline,
-    DPMSolverMultistepScheduler
+    StableDiffusionInpaintPipeline
 )
 from huggingface_hub import hf_hub_download, login
 from PIL import Image
+from cpu_backends import is_cpu_backend, load_backend_pipeline, derive_backend_pipeline, estimate_footprint, list_cpu_backends
+from quantization import QUANTIZATION_MODES, get_quantized_cache_dir, load_quantized_components, quantize_pipeline_int8
+from compilation import compile_pipeline, bucket_resolution, record_compiled_shape
+from prompt_embeddings import PromptEmbeddingCache
+from init_latents import InitLatentCache
+
+# Token birleştirme (ToMe) kütüphanesini kontrollü bir şekilde import et
+try:
+    import tomesd
+    TOMESD_AVAILABLE = True
+except ImportError:
+    TOMESD_AVAILABLE = False
 
 # Loglama ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -62,6 +83,72 @@ AVAILABLE_LORAS = {
     }
 }
 
+# Görev pipeline sınıfları - hepsi aynı model bileşenlerini (unet, vae, text_encoder...) paylaşır
+TASK_PIPELINES = {
+    "txt2img": StableDiffusionPipeline,
+    "img2img": StableDiffusionImg2ImgPipeline,
+    "inpaint": StableDiffusionInpaintPipeline,
+}
+
+# Örnekleyiciler (scheduler): diffusers sınıfı, ek yapılandırma ve önerilen adım sayısı
+# Sınıflar isimle tutulur; kurulu diffusers sürümünde olmayanlar kullanılamaz olarak işaretlenir
+AVAILABLE_SCHEDULERS = {
+    "dpmpp-2m": {
+        "name": "DPM++ 2M",
+        "class": "DPMSolverMultistepScheduler",
+        "config": {},
+        "steps": 25,
+        "default": True
+    },
+    "dpmpp-2m-karras": {
+        "name": "DPM++ 2M Karras",
+        "class": "DPMSolverMultistepScheduler",
+        "config": {"use_karras_sigmas": True},
+        "steps": 20
+    },
+    "dpmpp-2s": {
+        "name": "DPM++ 2S",
+        "class": "DPMSolverSinglestepScheduler",
+        "config": {},
+        "steps": 20
+    },
+    "euler": {
+        "name": "Euler",
+        "class": "EulerDiscreteScheduler",
+        "config": {},
+        "steps": 30
+    },
+    "euler-a": {
+        "name": "Euler Ancestral",
+        "class": "EulerAncestralDiscreteScheduler",
+        "config": {},
+        "steps": 30
+    },
+    "unipc": {
+        "name": "UniPC",
+        "class": "UniPCMultistepScheduler",
+        "config": {},
+        "steps": 20
+    },
+    "ddim": {
+        "name": "DDIM",
+        "class": "DDIMScheduler",
+        "config": {},
+        "steps": 50
+    },
+    "lcm": {
+        "name": "LCM",
+        "class": "LCMScheduler",
+        "config": {},
+        "steps": 6,
+        "description": "Yalnızca LCM modeli veya LCM-LoRA ile kaliteli sonuç verir"
+    }
+}
+
+# İçerikleri aynıysa modeller arasında tek kopya olarak paylaşılan bileşenler
+# (VAE paylaşılmaz: döşemeli/dilimli mod istek bazında değişir ve model kilidi onu korur)
+SHAREABLE_COMPONENTS = ("text_encoder", "tokenizer", "safety_checker", "feature_extractor")
+
 # Model ID'lerine göre önerilen promptlar
 PROMPT_SUGGESTIONS = {
     "runwayml/stable-diffusion-v1-5": [
@@ -86,19 +173,348 @@ PROMPT_SUGGESTIONS = {
     ]
 }
 
+# Önbellek bütçeleri (GB). Tanımlı değilse sistem belleğine göre otomatik belirlenir.
+RAM_BUDGET_ENV = "IMGGENAI_RAM_BUDGET_GB"
+DEVICE_BUDGET_ENV = "IMGGENAI_DEVICE_BUDGET_GB"
+
+# Bu piksel sayısı ve üzerindeki çözünürlüklerde VAE döşemeli (tiled) ve dilimli çalışır
+VAE_TILING_PIXELS_ENV = "IMGGENAI_VAE_TILING_PIXELS"
+DEFAULT_VAE_TILING_PIXELS = 768 * 768
+
+def _default_ram_budget():
+    """Varsayılan RAM bütçesi: fiziksel belleğin yarısı"""
+    try:
+        import psutil
+        return int(psutil.virtual_memory().total * 0.5)
+    except ImportError:
+        return None
+
+def _default_device_budget():
+    """Varsayılan cihaz bütçesi: GPU belleğinin %80'i (optimize_torch_for_device ile uyumlu)"""
+    if torch.cuda.is_available():
+        return int(torch.cuda.get_device_properties(0).total_memory * 0.8)
+    return None
+
+def _budget_from_env(env_name, default_fn):
+    """Ortam değişkenindeki GB değerini bayta çevirir"""
+    value = os.environ.get(env_name)
+    if value:
+        try:
+            return int(float(value) * (1024**3))
+        except ValueError:
+            logger.warning(f"Geçersiz bellek bütçesi: {env_name}={value}")
+    return default_fn()
+
+def measure_pipeline_footprint(pipe, seen=None):
+    """
+    Pipeline bileşenlerinin parametre ve buffer boyutlarını ölçer
+    
+    Args:
+        pipe: Diffusers pipeline'ı
+        seen: Daha önce sayılmış tensörlerin kümesi (paylaşılan ağırlıkları iki kez saymamak için)
+        
+    Returns:
+        dict: {"ram": bayt, "device": bayt}
+    """
+    if seen is None:
+        seen = set()
+    footprint = {"ram": 0, "device": 0}
+    components = getattr(pipe, "components", None) or {}
+    
+    for component in components.values():
+        if not isinstance(component, torch.nn.Module):
+            continue
+        # state_dict kuantize katmanların paketlenmiş ağırlıklarını da içerir
+        tensors = []
+        for value in component.state_dict(keep_vars=True).values():
+            if isinstance(value, (tuple, list)):
+                tensors.extend(item for item in value if isinstance(item, torch.Tensor))
+            elif isinstance(value, torch.Tensor):
+                tensors.append(value)
+        
+        for tensor in tensors:
+            key = (str(tensor.device), tensor.data_ptr())
+            if key in seen:
+                continue
+            seen.add(key)
+            size = tensor.numel() * tensor.element_size()
+            if tensor.device.type == "cpu":
+                footprint["ram"] += size
+            else:
+                footprint["device"] += size
+    
+    return footprint
+
+def fingerprint_component(component):
+    """
+    Bileşenin içerik özetini (hash) hesaplar
+    
+    Modüller için tüm tensörlerin adı, şekli, veri tipi ve içeriği; tokenizer ve
+    özellik çıkarıcılar için yapılandırma/sözlük içeriği kullanılır.
+    
+    Returns:
+        str: Hex özet veya desteklenmeyen bileşenler için None
+    """
+    hasher = hashlib.blake2b(digest_size=32)
+    hasher.update(type(component).__name__.encode())
+    
+    if isinstance(component, torch.nn.Module):
+        for name, tensor in component.state_dict().items():
+            hasher.update(name.encode())
+            hasher.update(f"{tuple(tensor.shape)}{tensor.dtype}".encode())
+            data = tensor.detach().contiguous().cpu().reshape(-1).view(torch.uint8)
+            hasher.update(data.numpy())
+    elif hasattr(component, "backend_tokenizer"):
+        # Hızlı tokenizer: sözlük ve birleştirme kurallarının tamamı
+        hasher.update(component.backend_tokenizer.to_str().encode())
+    elif hasattr(component, "get_vocab"):
+        hasher.update(json.dumps(component.get_vocab(), sort_keys=True).encode())
+        if hasattr(component, "bpe_ranks"):
+            hasher.update(str(sorted(component.bpe_ranks.items(), key=lambda item: item[1])).encode())
+    elif hasattr(component, "to_dict"):
+        hasher.update(json.dumps(component.to_dict(), sort_keys=True, default=str).encode())
+    else:
+        return None
+    
+    return hasher.hexdigest()
+
+def snapshot_component_fingerprints(snapshot_path, names):
+    """
+    Snapshot'taki bileşen dizinlerinin içerik özetlerini dosyaları okumadan hesaplar
+    
+    HF önbelleğinde snapshot dosyaları blobs/ altındaki dosyalara bağlantıdır ve blob
+    adı dosya içeriğinin özetidir (ağırlık dosyalarında sha256). Bileşen özeti dizindeki
+    dosya adları ve blob adlarından üretilir; bağlantı olmayan dosya içeren bileşenler atlanır.
+    
+    Returns:
+        dict: {bileşen adı: hex özet}
+    """
+    fingerprints = {}
+    for name in names:
+        component_dir = Path(snapshot_path) / name
+        if not component_dir.is_dir():
+            continue
+        
+        entries = []
+        for path in sorted(component_dir.rglob("*")):
+            if path.is_dir():
+                continue
+            if not path.is_symlink():
+                entries = None
+                break
+            entries.append(f"{path.relative_to(component_dir)}={Path(os.readlink(path)).name}")
+        
+        if entries:
+            fingerprints[name] = hashlib.sha256("\n".join(entries).encode()).hexdigest()[:32]
+    return fingerprints
+
+class ModelCache:
+    """
+    Bayt bütçesiyle sınırlandırılmış LRU model önbelleği
+    
+    RAM ve cihaz (GPU) belleği için ayrı bütçe tutar. Bütçe aşıldığında en uzun süre
+    kullanılmayan ve sabitlenmemiş modeller bellekten çıkarılır.
+    """
+    
+    def __init__(self, ram_budget=None, device_budget=None, on_evict=None):
+        self.ram_budget = ram_budget
+        self.device_budget = device_budget
+        self.on_evict = on_evict
+        self.pinned = set()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+    
+    def __contains__(self, key):
+        return key in self._entries
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def items(self):
+        """(anahtar, pipeline) çiftlerini LRU sırasına dokunmadan döndürür"""
+        with self._lock:
+            return [(key, entry["value"]) for key, entry in self._entries.items()]
+    
+    def get(self, key):
+        """Önbellekten pipeline döndürür ve LRU sırasını günceller"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["value"]
+    
+    def model_id_of(self, key):
+        """Önbellek girdisinin model kimliğini döndürür (girdi yoksa None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry["model_id"] if entry else None
+    
+    def put(self, key, value, model_id, footprint=None):
+        """
+        Pipeline'ı önbelleğe ekler ve gerekirse eski modelleri çıkarır
+        
+        Args:
+            footprint: Parametreleri torch tensörü olmayan pipeline'lar için
+                       {"ram": bayt, "device": bayt} biçiminde bellek tahmini
+        """
+        with self._lock:
+            self._entries[key] = {"value": value, "model_id": model_id, "footprint": footprint}
+            self._entries.move_to_end(key)
+            self._evict_until_within_budget(keep=key)
+    
+    def usage(self):
+        """Önbellekteki tüm modellerin toplam bellek kullanımı (paylaşılan ağırlıklar bir kez sayılır)"""
+        with self._lock:
+            seen = set()
+            total = {"ram": 0, "device": 0}
+            for entry in self._entries.values():
+                footprint = entry["footprint"] or measure_pipeline_footprint(entry["value"], seen)
+                total["ram"] += footprint["ram"]
+                total["device"] += footprint["device"]
+            return total
+    
+    def ensure_capacity(self, ram_bytes=0, device_bytes=0):
+        """Yeni bir model yüklenmeden önce tahmini boyut kadar yer açar"""
+        with self._lock:
+            self._evict_until_within_budget(extra={"ram": ram_bytes, "device": device_bytes})
+    
+    def evict(self, key):
+        """Belirtilen girdiyi önbellekten çıkarır"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self.stats["evictions"] += 1
+            logger.info(f"Model önbellekten çıkarıldı: {key}")
+            if self.on_evict:
+                self.on_evict(key, entry["value"])
+            del entry
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            return True
+    
+    def _over_budget(self, usage, extra):
+        if self.ram_budget is not None and usage["ram"] + extra["ram"] > self.ram_budget:
+            return True
+        if self.device_budget is not None and usage["device"] + extra["device"] > self.device_budget:
+            return True
+        return False
+    
+    def _evict_until_within_budget(self, keep=None, extra=None):
+        extra = extra or {"ram": 0, "device": 0}
+        while self._over_budget(self.usage(), extra):
+            victim = next(
+                (key for key, entry in self._entries.items()
+                 if key != keep and entry["model_id"] not in self.pinned),
+                None
+            )
+            if victim is None:
+                logger.warning("Bellek bütçesi aşıldı ancak çıkarılabilecek model yok (sabitlenmiş veya kullanımda)")
+                break
+            self.evict(victim)
+    
+    def max_footprint(self):
+        """Önbellekteki en büyük modelin boyutu (yeni yükleme tahmini için)"""
+        with self._lock:
+            largest = {"ram": 0, "device": 0}
+            for entry in self._entries.values():
+                footprint = entry["footprint"] or measure_pipeline_footprint(entry["value"])
+                largest["ram"] = max(largest["ram"], footprint["ram"])
+                largest["device"] = max(largest["device"], footprint["device"])
+            return largest
+    
+    def get_stats(self):
+        """Önbellek sayaçlarını ve bellek kullanımını döndürür"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "entries": list(self._entries.keys()),
+                "pinned": sorted(self.pinned),
+                "usage": self.usage(),
+                "ram_budget": self.ram_budget,
+                "device_budget": self.device_budget,
+            })
+            return stats
+
 class ModelManager:
-    def __init__(self, models_dir="/home/agrotest2/imggenai/models"):
+    def __init__(self, models_dir="/home/agrotest2/imggenai/models", ram_budget_gb=None, device_budget_gb=None, lora_fuse_threshold=3):
         """Model yöneticisi başlatır"""
         self.models_dir = Path(models_dir)
         self.models_dir.mkdir(parents=True, exist_ok=True)
         self.lora_dir = self.models_dir / "loras"
         self.lora_dir.mkdir(parents=True, exist_ok=True)
-        self.model_cache = {}
+        
+        # Bellek bütçeli LRU model önbelleği
+        ram_budget = int(ram_budget_gb * (1024**3)) if ram_budget_gb else _budget_from_env(RAM_BUDGET_ENV, _default_ram_budget)
+        device_budget = int(device_budget_gb * (1024**3)) if device_budget_gb else _budget_from_env(DEVICE_BUDGET_ENV, _default_device_budget)
+        self.model_cache = ModelCache(ram_budget, device_budget, on_evict=self._on_model_evicted)
         self.current_model_id = None
+        
+        # Önbellek anahtarı -> {(görev, güvenlik filtresi): pipeline}; görev pipeline'ları bir kez oluşturulur
+        self.task_pipelines = {}
+        # Yüklenen pipeline -> önbellek anahtarı
+        self.pipeline_keys = weakref.WeakKeyDictionary()
+        # Önbellek anahtarı -> etkin bellek modları (attention slicing, offload)
+        self.execution_modes = {}
+        # GPU olmayan sistemlerde kullanılacak alternatif CPU motoru (None: PyTorch)
+        self.cpu_backend = None
+        # CPU yüklemelerinde varsayılan kuantizasyon modu (None: kapalı)
+        self.default_quantize = None
+        # torch.compile modu açıkken yüklenen modeller derlenir
+        self.compile_mode = False
+        self.compiled_models = set()
+        # Sunucu genelinde CPU offload (--low-memory); açıkken tüm CUDA modelleri offload ile çalışır
+        self.cpu_offload = False
+        
+        # Model kimliği -> varsayılan token birleştirme oranı (None anahtarı: tüm modeller)
+        self.token_merging_defaults = {}
+        
+        # Bu piksel sayısından büyük isteklerde VAE döşemeli kodlama/çözümleme kullanır
+        self.vae_tiling_pixels = int(os.environ.get(VAE_TILING_PIXELS_ENV, DEFAULT_VAE_TILING_PIXELS))
+        
+        # Text encoder çıktıları için LRU önbellek
+        self.prompt_embeddings = PromptEmbeddingCache()
+        # img2img başlangıç görsellerinin latent'leri için LRU önbellek
+        self.init_latents = InitLatentCache()
+        # Önbellek anahtarı -> VAE içerik özeti (latent önbelleği anahtarı için)
+        self.vae_fingerprints = {}
+        # Önbellek anahtarı -> modelin orijinal scheduler yapılandırması
+        self.scheduler_configs = {}
+        
+        # Paylaşılan kayıtlar (kilit tabloları, bileşen paylaşımı) için kısa süreli kilit;
+        # yavaş yüklemeler model başına load_locks ile sıraya konur
+        self._load_lock = threading.RLock()
+        # Önbellek anahtarı -> yükleme kilidi; aynı model iki kez yüklenmez, diğer
+        # modellerin istekleri bu yüklemeyi beklemez
+        self.load_locks = {}
+        # Önbellek anahtarı -> çalıştırma kilidi; paylaşılan UNet/VAE/scheduler üzerindeki
+        # istek ayarları ve pipeline çağrıları model başına sırayla yapılır
+        self.execution_locks = {}
+        
+        # Ön yükleme durumu: "ready" (hazır), "loading" (yükleniyor) veya "error" (hata)
+        self.readiness = {"state": "ready", "models": {}, "error": None}
+        
+        # İçerik özeti -> bellekte bulunan bileşen (hiçbir model kullanmıyorsa kendiliğinden silinir)
+        self.shared_components = weakref.WeakValueDictionary()
+        self.sharing_stats = {"reused": 0, "bytes_saved": 0}
 
         # Lora dosyalarının konumlarını takip et
         self.lora_paths = {}
         
+        # Önbellek anahtarı -> LoRA durumu (yüklü adaptörler, etkin ve birleştirilmiş kombinasyon, ardışık kullanım)
+        self.lora_states = {}
+        # Aynı (LoRA, ağırlık) bu kadar ardışık istekte kullanılırsa UNet ağırlıklarına birleştirilir (0: kapalı)
+        self.lora_fuse_threshold = lora_fuse_threshold
+        
+        # Yerel model manifestosu: model kimliği -> indirilmiş snapshot dizini
+        self.manifest_path = self.models_dir / "model_manifest.json"
+        self.manifest = self._read_manifest()
+        
         # Model bilgilerini kaydet
         self.save_model_info()
     
@@ -111,6 +527,60 @@ class ModelManager:
         with open(self.models_dir / "model_info.json", "w") as f:
             json.dump(model_info, f, indent=4)
     
+    def _read_manifest(self):
+        """Yerel model manifestosunu okur"""
+        if not self.manifest_path.exists():
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Model manifestosu okunamadı: {e}")
+            return {}
+    
+    def _write_manifest(self):
+        """Manifestoyu diske yazar (yarım yazılmış dosya kalmaması için önce geçici dosyaya)"""
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+    
+    def _record_snapshot(self, model_id, repo_id, local_files_only=True):
+        """Modelin yerel snapshot dizinini bulur ve manifestoya kaydeder"""
+        try:
+            snapshot_path = StableDiffusionPipeline.download(repo_id, local_files_only=local_files_only)
+        except Exception as e:
+            logger.debug(f"Snapshot dizini bulunamadı ({model_id}): {e}")
+            return None
+        
+        self.manifest[model_id] = {
+            "repo": repo_id,
+            "path": str(snapshot_path),
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self._write_manifest()
+        return str(snapshot_path)
+    
+    def _get_quantized_dir(self, model_id, repo_id, snapshot_path):
+        """Kuantize bileşen dizinini depo ve snapshot revizyonuna (snapshot dizini adı) göre döndürür"""
+        revision = Path(snapshot_path).name if snapshot_path else None
+        return get_quantized_cache_dir(model_id, repo_id, revision)
+    
+    def _resolve_snapshot(self, model_id):
+        """Manifestoda kayıtlı ve diskte eksiksiz duran snapshot dizinini döndürür"""
+        entry = self.manifest.get(model_id)
+        if not entry:
+            return None
+        
+        snapshot_path = Path(entry["path"])
+        if entry.get("repo") != AVAILABLE_MODELS[model_id]["repo"] or not (snapshot_path / "model_index.json").exists():
+            logger.warning(f"Manifestodaki model dosyaları eksik veya güncel değil: {model_id}")
+            self.manifest.pop(model_id, None)
+            self._write_manifest()
+            return None
+        
+        return str(snapshot_path)
+    
     def list_models(self):
         """Kullanılabilir modelleri listeler"""
         return AVAILABLE_MODELS
@@ -119,6 +589,44 @@ class ModelManager:
         """Kullanılabilir LoRA adaptasyonlarını listeler"""
         return AVAILABLE_LORAS
     
+    def list_schedulers(self):
+        """Kurulu diffusers sürümünde kullanılabilen örnekleyicileri listeler"""
+        return {
+            name: info for name, info in AVAILABLE_SCHEDULERS.items()
+            if hasattr(diffusers, info["class"])
+        }
+    
+    def get_default_scheduler(self):
+        """Varsayılan örnekleyici adını döndürür"""
+        for name, info in AVAILABLE_SCHEDULERS.items():
+            if info.get("default", False):
+                return name
+        return list(AVAILABLE_SCHEDULERS.keys())[0]
+    
+    def get_recommended_steps(self, scheduler=None):
+        """Örnekleyici için önerilen diffusion adımı sayısını döndürür"""
+        info = AVAILABLE_SCHEDULERS.get(scheduler or self.get_default_scheduler())
+        if info is None:
+            info = AVAILABLE_SCHEDULERS[self.get_default_scheduler()]
+        return info["steps"]
+    
+    def get_scheduler(self, cache_key, scheduler=None):
+        """
+        Model için istenen örnekleyicinin yeni bir örneğini döndürür
+        
+        Örnekleyiciler adım durumu (timesteps, çok adımlı çözücü geçmişi) tuttuğundan
+        istekler arasında paylaşılmaz; her çağrıda modelin orijinal yapılandırmasından
+        oluşturulur (from_config ağırlık yüklemez, maliyeti ihmal edilebilir).
+        """
+        name = scheduler or self.get_default_scheduler()
+        if name not in self.list_schedulers():
+            logger.warning(f"Örnekleyici bulunamadı: {name}, varsayılan kullanılıyor")
+            name = self.get_default_scheduler()
+        
+        info = AVAILABLE_SCHEDULERS[name]
+        scheduler_class = getattr(diffusers, info["class"])
+        return scheduler_class.from_config(self.scheduler_configs[cache_key], **info["config"])
+    
     def get_default_model_id(self):
         """Varsayılan model kimliğini döndürür"""
         for model_id, info in AVAILABLE_MODELS.items():
@@ -166,93 +674,202 @@ class ModelManager:
             
             logger.info(f"{model_id} modeli önbelleğe alınıyor...")
             try:
-                _ = StableDiffusionPipeline.from_pretrained(
-                    model_info["repo"],
-                    local_files_only=False
-                )
-                logger.info(f"{model_id} modeli başarıyla indirildi")
+                # Yalnızca pipeline dosyalarını indir ve snapshot dizinini manifestoya kaydet
+                snapshot_path = self._record_snapshot(model_id, model_info["repo"], local_files_only=False)
+                if snapshot_path is None:
+                    raise RuntimeError("snapshot indirilemedi")
+                logger.info(f"{model_id} modeli başarıyla indirildi: {snapshot_path}")
             except Exception as e:
                 logger.error(f"{model_id} modeli indirilemedi: {e}")
     
-    def load_model(self, model_id=None, device=None, safety_checker=True, low_memory=False):
+    def _resolve_device(self, device=None):
+        """Cihaz belirtilmemişse kullanılabilir en iyi cihazı seçer"""
+        if device is not None:
+            return device
+        if torch.cuda.is_available():
+            return "cuda"
+        if hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
+            return "mps"
+        return self.get_cpu_device()
+    
+    def _on_model_evicted(self, cache_key, pipe):
+        """Önbellekten çıkarılan modelin görev pipeline'larını da bırakır"""
+        self.task_pipelines.pop(cache_key, None)
+        self.execution_modes.pop(cache_key, None)
+        self.lora_states.pop(cache_key, None)
+        self.scheduler_configs.pop(cache_key, None)
+        self.compiled_models.discard(cache_key)
+        self.prompt_embeddings.invalidate(cache_key)
+        # VAE başka bir modelle paylaşılmıyorsa latent'lerini de bırak
+        vae_fingerprint = self.vae_fingerprints.pop(cache_key, None)
+        if vae_fingerprint and vae_fingerprint not in self.vae_fingerprints.values():
+            self.init_latents.invalidate(vae_fingerprint)
+        self.execution_locks.pop(cache_key, None)
+    
+    def _get_share_keys(self, snapshot_path, device, dtype, quantize):
+        """Paylaşılabilir bileşenlerin paylaşım anahtarlarını snapshot dosyalarından üretir"""
+        if not snapshot_path:
+            return {}
+        fingerprints = snapshot_component_fingerprints(snapshot_path, SHAREABLE_COMPONENTS)
+        return {
+            name: f"{name}:{device}:{dtype}:{quantize or 'none'}:{fingerprint}"
+            for name, fingerprint in fingerprints.items()
+        }
+    
+    def _record_reuse(self, name, component):
+        """Paylaşım istatistiklerini günceller"""
+        if isinstance(component, torch.nn.Module):
+            self.sharing_stats["bytes_saved"] += sum(t.numel() * t.element_size() for t in component.state_dict().values())
+        self.sharing_stats["reused"] += 1
+        logger.info(f"Bileşen paylaşılıyor: {name} (bellekte aynı içerikli kopya bulundu)")
+    
+    def _find_resident_components(self, share_keys):
         """
-        Belirtilen modeli bellek verimli şekilde yükler
+        Bellekte aynı içerikli kopyası bulunan bileşenleri döndürür
         
-        Args:
-            model_id: Model kimliği (AVAILABLE_MODELS içinde tanımlı)
-            device: "cuda", "mps" veya "cpu"
-            safety_checker: Güvenlik filtresinin kullanılıp kullanılmayacağı
-            low_memory: Düşük bellek modu aktifleştirilsin mi?
+        Dönen bileşenler from_pretrained'e verilir; böylece kopyaları diskten hiç yüklenmez.
         """
-        if not model_id:
-            model_id = self.get_default_model_id()
+        with self._load_lock:
+            resident = {
+                name: self.shared_components.get(share_key)
+                for name, share_key in share_keys.items()
+            }
+        resident = {name: component for name, component in resident.items() if component is not None}
+        for name, component in resident.items():
+            self._record_reuse(name, component)
+        return resident
+    
+    def _register_shared_components(self, pipe, share_keys):
+        """
+        Yüklenen bileşenleri paylaşım kaydına ekler
         
-        # Cihazı belirle
-        if device is None:
-            if torch.cuda.is_available():
-                device = "cuda"
-            elif hasattr(torch.backends, "mps") and torch.backends.mps.is_available():
-                device = "mps"
-            else:
-                device = "cpu"
+        Snapshot ilk kez hub'dan indirildiyse veya aynı bileşen eşzamanlı yüklenen başka
+        bir modelle o sırada kaydedildiyse bellekteki kopya kullanılır ve yenisi bırakılır.
+        """
+        replacements = {}
+        with self._load_lock:
+            for name, share_key in share_keys.items():
+                component = getattr(pipe, name, None)
+                if component is None:
+                    continue
+                resident = self.shared_components.get(share_key)
+                if resident is None:
+                    self.shared_components[share_key] = component
+                elif resident is not component:
+                    replacements[name] = resident
         
-        logger.info(f"'{model_id}' modeli {device} cihazı için yükleniyor...")
+        if replacements:
+            for name, component in replacements.items():
+                self._record_reuse(name, component)
+            pipe.register_modules(**replacements)
+            gc.collect()
+        return pipe
+    
+    def _load_weights(self, model_id, device, quantize=None):
+        """
+        Model ağırlıklarını cihaz başına tek kopya olarak yükler veya önbellekten döndürür
+        
+        Args:
+            quantize: "int8" ise text encoder ve UNet kuantize edilmiş olarak yüklenir (yalnızca CPU)
+        
+        Returns:
+            tuple: (önbellek anahtarı, temel pipeline) veya yüklenemezse (None, None)
+        """
+        # Kuantize ağırlıklar ayrı bir kopya olduğundan önbellek anahtarına eklenir
+        cache_key = f"{model_id}_{device}_{quantize}" if quantize else f"{model_id}_{device}"
         
         # Model zaten yüklendiyse ve aynı cihazda ise doğrudan döndür
-        cache_key = f"{model_id}_{device}_{safety_checker}_{low_memory}"
-        if cache_key in self.model_cache:
+        cached_pipe = self.model_cache.get(cache_key)
+        if cached_pipe is not None:
             logger.info(f"Model önbellekten kullanılıyor: {model_id}")
             self.current_model_id = model_id
-            return self.model_cache[cache_key]
+            return cache_key, cached_pipe
         
         # Model bilgilerini al
         if model_id not in AVAILABLE_MODELS:
             logger.warning(f"Model bulunamadı: {model_id}, varsayılan model kullanılıyor")
-            model_id = self.get_default_model_id()
+            return self._load_weights(self.get_default_model_id(), device, quantize)
         
         model_info = AVAILABLE_MODELS[model_id]
         repo_id = model_info["repo"]
         
         try:
+            # Yeni model için önceden yer aç (en büyük mevcut model boyutu tahmin olarak kullanılır)
+            estimate = self.model_cache.max_footprint()
+            self.model_cache.ensure_capacity(estimate["ram"], estimate["device"])
+            
             # Bellek optimizasyonu yapılandırması
+            # Bellek modları istek bazında uygulanır, ağırlıklar tek seferde yüklenir
+            # Güvenlik filtresi yüklenmez (filtresiz modeller ve ~1.2 GB ek ağırlık)
             load_options = {
                 "torch_dtype": torch.float16 if device == "cuda" else torch.float32,
-                "safety_checker": None if not safety_checker else None,  # Güvenlik kontrolünü devre dışı bırakabilirsiniz
-                "local_files_only": False  # Yüklü değilse indir
+                "safety_checker": None,
+                "requires_safety_checker": False,
+                "low_cpu_mem_usage": True
             }
             
-            # Düşük bellek modu için ek ayarlar
-            if low_memory:
-                load_options["variant"] = "fp16" if device == "cuda" else None
-                load_options["low_cpu_mem_usage"] = True
+            # Model yükle - manifestoda kayıtlıysa ağ erişimi olmadan doğrudan yerel diskten
+            load_start = time.time()
+            pipe = None
+            load_source = "yerel manifesto"
+            snapshot_path = self._resolve_snapshot(model_id)
             
-            # Model yükle
-            pipe = StableDiffusionPipeline.from_pretrained(
-                repo_id,
-                **load_options
-            )
+            # Başka bir model için bellekte bulunan aynı bileşenler diskten yüklenmez
+            share_keys = self._get_share_keys(snapshot_path, device, load_options["torch_dtype"], quantize)
+            resident = self._find_resident_components(share_keys)
+            load_options.update(resident)
+            
+            # Daha önce kuantize edilmiş bileşenler varsa fp32 ağırlıkları hiç yüklenmez
+            if quantize and snapshot_path:
+                load_options.update(load_quantized_components(self._get_quantized_dir(model_id, repo_id, snapshot_path), skip=resident))
+            
+            if snapshot_path:
+                try:
+                    pipe = StableDiffusionPipeline.from_pretrained(
+                        snapshot_path,
+                        local_files_only=True,
+                        **load_options
+                    )
+                except Exception as e:
+                    logger.warning(f"Yerel snapshot yüklenemedi, hub üzerinden deneniyor: {e}")
+            
+            if pipe is None:
+                load_source = "hub"
+                pipe = StableDiffusionPipeline.from_pretrained(
+                    repo_id,
+                    local_files_only=False,  # Yüklü değilse indir
+                    **load_options
+                )
+                snapshot_path = self._record_snapshot(model_id, repo_id)
+                share_keys = self._get_share_keys(snapshot_path, device, load_options["torch_dtype"], quantize)
+            
+            logger.info(f"Model dosyaları {time.time() - load_start:.2f} saniyede yüklendi ({load_source})")
+            
+            if quantize:
+                quantize_start = time.time()
+                pipe = quantize_pipeline_int8(pipe, self._get_quantized_dir(model_id, repo_id, snapshot_path))
+                logger.info(f"int8 kuantizasyon hazır ({time.time() - quantize_start:.2f} saniye)")
+            
+            # Yeni bileşenleri sonraki modeller için paylaşım kaydına ekle
+            pipe = self._register_shared_components(pipe, share_keys)
             
             # Cihaza taşı
             pipe = pipe.to(device)
             
-            # Bellek optimizasyonu
-            if device == "cuda":
-                pipe.enable_attention_slicing()
-                if low_memory:
-                    if hasattr(pipe, "enable_model_cpu_offload"):
-                        pipe.enable_model_cpu_offload()
-                    else:
-                        logger.warning("CPU offload bu model için uygulanamadı")
-            
-            # Programlayıcıyı DPM-Solver olarak değiştir (daha hızlı ve kaliteli)
-            pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+            # Orijinal scheduler yapılandırmasını sakla; örnekleyici istek bazında seçilir
+            # (varsayılan DPM-Solver: daha hızlı ve kaliteli)
+            self.scheduler_configs[cache_key] = pipe.scheduler.config
+            pipe.scheduler = self.get_scheduler(cache_key)
             
-            # Önbelleğe al
-            self.model_cache[cache_key] = pipe
+            # Önbelleğe al (bütçe aşılırsa en eski modeller çıkarılır)
+            self.model_cache.put(cache_key, pipe, model_id)
+            self.pipeline_keys[pipe] = cache_key
+            self.task_pipelines[cache_key] = {}
+            self.execution_modes[cache_key] = {"attention_slicing": False, "offload": False}
             self.current_model_id = model_id
             
             logger.info(f"Model başarıyla yüklendi: {model_id}")
-            return pipe
+            return cache_key, pipe
         
         except Exception as e:
             logger.error(f"Model yüklenirken hata oluştu {model_id}: {e}")
@@ -260,31 +877,619 @@ class ModelManager:
             # Yedek olarak varsayılan modeli dene
             if model_id != "stable-diffusion-v1-5":
                 logger.info("Varsayılan model yükleniyor...")
-                return self.load_model("stable-diffusion-v1-5", device, safety_checker, low_memory)
+                return self._load_weights("stable-diffusion-v1-5", device, quantize)
             else:
                 logger.error("Varsayılan model de yüklenemedi!")
+                return None, None
+    
+    def _apply_execution_mode(self, cache_key, pipe, device, low_memory):
+        """
+        Bellek modlarını (attention slicing, CPU offload) istek için ayarlar
+        
+        Modlar paylaşılan bileşenler üzerinde çalıştığından yalnızca değiştiklerinde uygulanır.
+        CPU offload kalıcıdır: bir kez açılınca düşük bellek modu olmayan isteklerde kapatılmaz
+        (açıp kapatmak tüm modeli CPU ile GPU arasında taşır).
+        """
+        current = self.execution_modes.setdefault(cache_key, {"attention_slicing": False, "offload": False})
+        desired = {
+            "attention_slicing": device == "cuda" or low_memory,
+            "offload": self._wants_offload(cache_key, device, low_memory)
+        }
+        
+        if desired["attention_slicing"] != current["attention_slicing"]:
+            if desired["attention_slicing"]:
+                pipe.enable_attention_slicing()
+            else:
+                pipe.disable_attention_slicing()
+            current["attention_slicing"] = desired["attention_slicing"]
+        
+        if desired["offload"] and not current["offload"]:
+            if hasattr(pipe, "enable_model_cpu_offload"):
+                pipe.enable_model_cpu_offload()
+                current["offload"] = True
+            else:
+                logger.warning("CPU offload bu model için uygulanamadı")
+    
+    def _wants_offload(self, cache_key, device, low_memory):
+        """Modelin CPU offload ile çalışıp çalışmayacağını döndürür (yalnızca CUDA)"""
+        already = self.execution_modes.get(cache_key, {}).get("offload", False)
+        return device == "cuda" and (low_memory or self.cpu_offload or already)
+    
+    def set_cpu_offload(self, enabled=True):
+        """Sunucu genelinde CPU offload'u açar; paylaşılan bileşenler tüm modellerde aynı modda kalır"""
+        self.cpu_offload = enabled
+        logger.info(f"CPU offload: {'açık' if enabled else 'kapalı'}")
+    
+    def set_token_merging(self, ratio, model_id=None):
+        """
+        Token birleştirme (ToMe) oranını model için (model_id None ise tüm modeller için) ayarlar
+        
+        Args:
+            ratio: Birleştirilecek uzamsal token oranı (0: kapalı, önerilen 0.3-0.5)
+            model_id: Model kimliği (None ise genel varsayılan)
+        """
+        ratio = float(ratio or 0)
+        if not 0 <= ratio < 1:
+            logger.warning(f"Geçersiz token birleştirme oranı: {ratio}")
+            return
+        if ratio and not TOMESD_AVAILABLE:
+            logger.warning("tomesd kurulu değil, token birleştirme kullanılamaz. Yüklemek için: pip install tomesd")
+            return
+        self.token_merging_defaults[model_id] = ratio
+        logger.info(f"Token birleştirme oranı ({model_id or 'tüm modeller'}): {ratio}")
+    
+    def resolve_token_merging(self, model_id=None, token_merging=None):
+        """İstek için geçerli token birleştirme oranını döndürür (istek > model > genel varsayılan)"""
+        if token_merging is None:
+            model_id = model_id or self.get_default_model_id()
+            token_merging = self.token_merging_defaults.get(model_id, self.token_merging_defaults.get(None, 0))
+        if token_merging and not TOMESD_AVAILABLE:
+            return 0.0
+        return float(token_merging or 0)
+    
+    def _apply_token_merging(self, cache_key, pipe, ratio):
+        """
+        UNet'in self-attention katmanlarına token birleştirme yamasını uygular
+        
+        Birbirine benzeyen uzamsal token'lar attention'dan önce birleştirilir, sonra geri
+        açılır. UNet görev pipeline'ları arasında paylaşıldığından yama yalnızca oran
+        değiştiğinde yenilenir.
+        """
+        current = self.execution_modes.setdefault(cache_key, {"attention_slicing": False, "offload": False})
+        if current.get("token_merging", 0.0) == ratio:
+            return
+        
+        tomesd.remove_patch(pipe.unet)
+        if ratio:
+            tomesd.apply_patch(pipe.unet, ratio=ratio)
+            logger.info(f"Token birleştirme etkin: oran {ratio} ({cache_key})")
+        current["token_merging"] = ratio
+    
+    def configure_vae_memory(self, pipe, width, height):
+        """
+        Büyük çözünürlüklerde VAE'yi döşemeli (tiled) ve dilimli (sliced) çalıştırır
+        
+        Döşemeli modda görsel örtüşen parçalar halinde kodlanıp çözümlenir ve kenarlar
+        harmanlanır; dilimli modda batch'teki görseller tek tek işlenir. Böylece VAE'nin
+        tepe bellek kullanımı çözünürlükten bağımsız kalır. Mod, VAE modülünün kendi
+        durumuna bakılarak her istekte modelin çalıştırma kilidi altında ayarlanır.
+        
+        Returns:
+            bool: Döşemeli mod açıksa True
+        """
+        vae = getattr(pipe, "vae", None)
+        cache_key = self.pipeline_keys.get(pipe)
+        if cache_key is None or not isinstance(vae, torch.nn.Module) or not hasattr(vae, "enable_tiling"):
+            return False
+        
+        desired = width * height >= self.vae_tiling_pixels
+        
+        with self.execution_lock(pipe):
+            if desired != getattr(vae, "use_tiling", False):
+                if desired:
+                    vae.enable_tiling()
+                    logger.info(f"VAE döşemeli ve dilimli moda alındı ({width}x{height})")
+                else:
+                    vae.disable_tiling()
+            if desired != getattr(vae, "use_slicing", False):
+                if desired:
+                    vae.enable_slicing()
+                else:
+                    vae.disable_slicing()
+        
+        return desired
+    
+    def get_pipeline_model_id(self, pipe):
+        """Pipeline'ın gerçekte yüklendiği model kimliğini döndürür (varsayılana düşülmüş olabilir)"""
+        return self.model_cache.model_id_of(self.pipeline_keys.get(pipe))
+    
+    def execution_lock(self, pipe):
+        """
+        Pipeline'ın modeline ait çalıştırma kilidini döndürür
+        
+        Aynı modelin görev pipeline'ları UNet, VAE, text encoder ve LoRA durumunu
+        paylaşır. İstek ayarları (örnekleyici, bellek modları, token birleştirme, LoRA)
+        ve pipeline çağrısı bu kilit tutulurken yapılmalıdır; kilit aynı iş parçacığında
+        yeniden alınabilir.
+        """
+        cache_key = self.pipeline_keys.get(pipe)
+        with self._load_lock:
+            return self.execution_locks.setdefault(cache_key, threading.RLock())
+    
+    def _model_load_lock(self, model_id, device, quantize):
+        """Modelin önbellek anahtarına ait yükleme kilidini döndürür"""
+        if is_cpu_backend(device) or not quantize:
+            cache_key = f"{model_id}_{device}"
+        else:
+            cache_key = f"{model_id}_{device}_{quantize}"
+        with self._load_lock:
+            return self.load_locks.setdefault(cache_key, threading.RLock())
+    
+    def _load_task_pipeline(self, task, model_id, device, safety_checker, quantize):
+        """
+        get_task_pipeline için modelin yükleme kilidi altında görev pipeline'ını yükler
+        
+        Yükleme yalnızca aynı modeli bekleyen istekleri durdurur; önbellekteki diğer
+        modeller bu sırada kullanılmaya devam eder.
+        
+        Returns:
+            tuple: (görev pipeline'ı, temel pipeline) - yüklenemezse (None, None)
+        """
+        if model_id not in AVAILABLE_MODELS:
+            logger.warning(f"Model bulunamadı: {model_id}, varsayılan model kullanılıyor")
+            model_id = self.get_default_model_id()
+        
+        with self._model_load_lock(model_id, device, quantize):
+            if is_cpu_backend(device):
+                task_pipe = self._get_backend_pipeline(task, model_id, device)
+                return task_pipe, task_pipe
+            
+            cache_key, base_pipe = self._load_weights(model_id, device, quantize)
+            if base_pipe is None:
+                return None, None
+            return self._get_task_view(task, cache_key, base_pipe, safety_checker), base_pipe
+    
+    def _configure_request(self, task_pipe, base_pipe, device, low_memory, scheduler, token_merging):
+        """
+        İsteğe özel ayarları paylaşılan bileşenlere uygular (çalıştırma kilidi tutulurken çağrılır)
+        
+        Bellek modları ve token birleştirme yalnızca değiştiklerinde uygulanır; örnekleyici
+        her istek için yeniden oluşturulur.
+        """
+        cache_key = self.pipeline_keys[task_pipe]
+        
+        if is_cpu_backend(device):
+            if token_merging:
+                logger.warning(f"Token birleştirme {device} motorunda desteklenmiyor, kullanılmayacak")
+        else:
+            self._apply_execution_mode(cache_key, base_pipe, device, low_memory)
+            
+            # torch.compile modu: modül başına bir kez, yerinde derlenir
+            if self.compile_mode and cache_key not in self.compiled_models:
+                if self.execution_modes[cache_key]["offload"]:
+                    logger.warning("CPU offload açıkken derleme yapılamaz, model derlenmeden kullanılacak")
+                elif compile_pipeline(base_pipe):
+                    self.compiled_models.add(cache_key)
+                    logger.info(f"Model derleme için hazırlandı: {cache_key}")
+            
+            if TOMESD_AVAILABLE:
+                self._apply_token_merging(cache_key, task_pipe, token_merging)
+        
+        # Örnekleyiciyi yeniden yükleme yapmadan değiştir
+        task_pipe.scheduler = self.get_scheduler(cache_key, scheduler)
+    
+    def _resolve_request(self, model_id, device, quantize, token_merging):
+        """İstek için model, cihaz, kuantizasyon ve token birleştirme değerlerini çözer"""
+        if not model_id:
+            model_id = self.get_default_model_id()
+        
+        # Cihazı belirle
+        device = self._resolve_device(device)
+        
+        requested = self.default_quantize if quantize is None else quantize
+        quantize = self._effective_quantize(device, requested)
+        if requested and not quantize:
+            logger.warning(f"'{requested}' kuantizasyonu {device} cihazında desteklenmiyor, kullanılmayacak")
+        
+        return model_id, device, quantize, self.resolve_token_merging(model_id, token_merging)
+    
+    def _effective_quantize(self, device, quantize):
+        """Kuantizasyon modunu döndürür; yalnızca PyTorch CPU yolunda desteklenir"""
+        if quantize and device == "cpu" and quantize in QUANTIZATION_MODES:
+            return quantize
+        return None
+    
+    def get_output_settings(self, model_id, device, width, height, low_memory=False, quantize=None):
+        """
+        Çıktıyı etkileyen yükleme ayarlarını model yüklenmeden döndürür (sonuç önbelleği anahtarı için)
+        
+        Returns:
+            dict: {"quantize": kuantizasyon modu veya None,
+                   "compiled_size": derleme kovası (genişlik, yükseklik) veya derlenmiyorsa None}
+        """
+        model_id = model_id or self.get_default_model_id()
+        device = self._resolve_device(device)
+        quantize = self._effective_quantize(device, self.default_quantize if quantize is None else quantize)
+        
+        # _configure_request ile aynı koşul: CPU offload açıkken model derlenmez
+        cache_key = f"{model_id}_{device}_{quantize}" if quantize else f"{model_id}_{device}"
+        compiled = cache_key in self.compiled_models or (
+            self.compile_mode and not is_cpu_backend(device) and not self._wants_offload(cache_key, device, low_memory)
+        )
+        return {
+            "quantize": quantize,
+            "compiled_size": bucket_resolution(width, height) if compiled else None
+        }
+    
+    @contextmanager
+    def pipeline_session(self, task, model_id=None, device=None, safety_checker=False, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+        """
+        Görev pipeline'ını istek ayarlarıyla hazırlar ve blok boyunca modeli bu isteğe ayırır
+        
+        Aynı modeli kullanan diğer istekler (toplu üretim işçisi, img2img, iş akışları)
+        blok bitene kadar bekler; böylece örnekleyici, LoRA, bellek modları ve token
+        birleştirme denoising sırasında başka bir istek tarafından değiştirilmez.
+        Parametreler get_task_pipeline ile aynıdır.
+        
+        Yields:
+            Pipeline (yüklenemezse None)
+        """
+        if task not in TASK_PIPELINES:
+            logger.error(f"Bilinmeyen görev: {task}")
+            yield None
+            return
+        
+        model_id, device, quantize, token_merging = self._resolve_request(model_id, device, quantize, token_merging)
+        logger.info(f"'{model_id}' modeli {device} cihazı için yükleniyor...")
+        
+        task_pipe, base_pipe = self._load_task_pipeline(task, model_id, device, safety_checker, quantize)
+        if task_pipe is None:
+            yield None
+            return
+        
+        with self.execution_lock(task_pipe):
+            self._configure_request(task_pipe, base_pipe, device, low_memory, scheduler, token_merging)
+            yield task_pipe
+    
+    def get_task_pipeline(self, task, model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+        """
+        Modelin belirtilen görev için pipeline'ını döndürür
+        
+        Görev pipeline'ları temel modelin bileşenlerini paylaşır ve her model için
+        yalnızca bir kez oluşturulur; ağırlıklar kopyalanmaz ve cihaza yeniden taşınmaz.
+        Güvenlik filtresi ve bellek modları yeniden yükleme yapılmadan istek bazında uygulanır.
+        Ayarlar dönüşte kilit bırakıldığından eşzamanlı kullanımda pipeline_session tercih edilmelidir.
+        
+        Args:
+            task: "txt2img", "img2img" veya "inpaint"
+            model_id: Model kimliği (AVAILABLE_MODELS içinde tanımlı)
+            device: "cuda", "mps", "cpu" veya alternatif CPU motoru ("cpu-onnx", "cpu-openvino")
+            safety_checker: Güvenlik filtresinin kullanılıp kullanılmayacağı
+            low_memory: Düşük bellek modu aktifleştirilsin mi?
+            scheduler: Örnekleyici adı (AVAILABLE_SCHEDULERS içinde tanımlı, None ise varsayılan)
+            quantize: "int8" ise CPU için kuantize ağırlıklar kullanılır (None ise varsayılan ayar)
+            token_merging: Token birleştirme oranı (None ise model/genel varsayılan, 0: kapalı)
+        """
+        with self.pipeline_session(task, model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging) as task_pipe:
+            return task_pipe
+    
+    def _get_backend_pipeline(self, task, model_id, device):
+        """
+        Alternatif CPU motoru (ONNX Runtime / OpenVINO) için görev pipeline'ını döndürür
+        
+        Model her cihaz için bir kez (txt2img) yüklenir; diğer görevler aynı oturumları
+        paylaşan görünümler olarak oluşturulur. Bellek kullanımı dışa aktarılan dosya
+        boyutundan tahmin edilir.
+        """
+        if model_id not in AVAILABLE_MODELS:
+            logger.warning(f"Model bulunamadı: {model_id}, varsayılan model kullanılıyor")
+            model_id = self.get_default_model_id()
+        
+        cache_key = f"{model_id}_{device}"
+        base_pipe = self.model_cache.get(cache_key)
+        if base_pipe is not None:
+            logger.info(f"Model önbellekten kullanılıyor: {model_id} ({device})")
+        else:
+            try:
+                load_start = time.time()
+                source = self._resolve_snapshot(model_id) or AVAILABLE_MODELS[model_id]["repo"]
+                base_pipe, export_dir = load_backend_pipeline(device, model_id, source)
+                
+                self.scheduler_configs[cache_key] = base_pipe.scheduler.config
+                self.model_cache.put(cache_key, base_pipe, model_id, footprint={"ram": estimate_footprint(export_dir), "device": 0})
+                self.pipeline_keys[base_pipe] = cache_key
+                self.task_pipelines[cache_key] = {}
+                
+                logger.info(f"Model {device} motoruyla {time.time() - load_start:.2f} saniyede yüklendi: {model_id}")
+            except Exception as e:
+                logger.error(f"Model {device} motoruyla yüklenemedi {model_id}: {e}")
+                return None
+        
+        self.current_model_id = model_id
+        
+        tasks = self.task_pipelines.setdefault(cache_key, {})
+        view_key = (task, False)
+        if view_key not in tasks:
+            try:
+                task_pipe = derive_backend_pipeline(base_pipe, device, task)
+            except Exception as e:
+                logger.error(f"{task} pipeline dönüştürme hatası ({device}): {e}")
                 return None
+            tasks[view_key] = task_pipe
+            self.pipeline_keys[task_pipe] = cache_key
+            if task_pipe is not base_pipe:
+                logger.info(f"{task} pipeline'ı oluşturuldu: {cache_key} (oturumlar paylaşılıyor)")
+        return tasks[view_key]
     
-    def load_img2img_model(self, model_id=None, device=None, safety_checker=True, low_memory=False):
-        """Img2Img modeli yükle"""
-        # Önce txt2img modelini yükle
-        txt2img_pipe = self.load_model(model_id, device, safety_checker, low_memory)
+    def get_cpu_device(self):
+        """GPU olmayan sistemlerde kullanılacak cihaz adını döndürür ("cpu" veya seçili CPU motoru)"""
+        return self.cpu_backend or "cpu"
+    
+    def get_request_device(self):
+        """Üretim isteklerinin kullandığı cihazı döndürür (GPU yoksa seçili CPU motoru)"""
+        return "cuda" if torch.cuda.is_available() else self.get_cpu_device()
+    
+    def set_cpu_backend(self, backend=None):
+        """
+        GPU olmayan sistemlerde varsayılan CPU motorunu seçer
         
-        if txt2img_pipe is None:
-            return None
+        Args:
+            backend: "cpu-onnx", "cpu-openvino" veya None (PyTorch)
+        """
+        if backend and backend not in list_cpu_backends():
+            logger.warning(f"CPU motoru kullanılamıyor: {backend}, PyTorch ile devam ediliyor")
+            backend = None
+        self.cpu_backend = backend
+        logger.info(f"CPU motoru: {backend or 'PyTorch'}")
+    
+    def set_default_quantization(self, quantize=None):
+        """CPU yüklemeleri için varsayılan kuantizasyon modunu seçer ("int8" veya None)"""
+        if quantize and quantize not in QUANTIZATION_MODES:
+            logger.warning(f"Bilinmeyen kuantizasyon modu: {quantize}")
+            quantize = None
+        self.default_quantize = quantize
+        logger.info(f"CPU kuantizasyonu: {quantize or 'kapalı'}")
+    
+    def set_compile_mode(self, enabled=True):
+        """UNet ve VAE için torch.compile modunu açar veya kapatır (yalnızca yeni yüklemeleri etkiler)"""
+        self.compile_mode = enabled
+        logger.info(f"torch.compile modu: {'açık' if enabled else 'kapalı'}")
+    
+    def prepare_compiled_shape(self, pipe, width, height, batch_size=1):
+        """
+        Derlenmiş pipeline'lar için üretim çözünürlüğünü kovaya yuvarlar
+        
+        Returns:
+            tuple: (genişlik, yükseklik) - derlenmemiş pipeline'lar için değişmez
+        """
+        cache_key = self.pipeline_keys.get(pipe)
+        if cache_key not in self.compiled_models:
+            return width, height
+        
+        bucket_width, bucket_height = bucket_resolution(width, height)
+        dtype = str(pipe.unet.dtype).replace("torch.", "")
+        if record_compiled_shape(cache_key, dtype, bucket_width, bucket_height, batch_size):
+            logger.info(f"Yeni şekil derlenecek, ilk çalıştırma uzun sürebilir: {bucket_width}x{bucket_height} (batch {batch_size})")
+        if (bucket_width, bucket_height) != (width, height):
+            logger.info(f"Çözünürlük derleme kovasına yuvarlandı: {width}x{height} -> {bucket_width}x{bucket_height}")
+        return bucket_width, bucket_height
+    
+    def _get_task_view(self, task, cache_key, base_pipe, safety_checker):
+        """Temel modelin bileşenlerini paylaşan görev pipeline'ını döndürür (yükleme kilidi altında)"""
+        # Güvenlik filtresi yüklenmemişse filtreli ve filtresiz pipeline aynıdır
+        use_safety_checker = bool(safety_checker) and base_pipe.safety_checker is not None
+        tasks = self.task_pipelines.setdefault(cache_key, {})
+        view_key = (task, use_safety_checker)
+        
+        if view_key in tasks:
+            return tasks[view_key]
         
         try:
-            # Mevcut modelden img2img pipeline'ı oluştur
-            img2img_pipe = StableDiffusionImg2ImgPipeline(**txt2img_pipe.components)
+            # Mevcut modelin bileşenleriyle görev pipeline'ını oluştur
+            components = dict(base_pipe.components)
+            if not use_safety_checker:
+                components["safety_checker"] = None
             
-            # Aynı cihaza taşı
-            img2img_pipe = img2img_pipe.to(device)
+            if task == "txt2img" and use_safety_checker == (base_pipe.safety_checker is not None):
+                task_pipe = base_pipe
+            else:
+                task_pipe = TASK_PIPELINES[task](**components, requires_safety_checker=use_safety_checker)
             
-            return img2img_pipe
+            tasks[view_key] = task_pipe
+            self.pipeline_keys[task_pipe] = cache_key
+            logger.info(f"{task} pipeline'ı oluşturuldu: {cache_key} (güvenlik filtresi: {use_safety_checker})")
+            return task_pipe
         except Exception as e:
-            logger.error(f"Img2img dönüştürme hatası: {e}")
+            logger.error(f"{task} pipeline dönüştürme hatası: {e}")
             return None
     
+    def load_model(self, model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+        """
+        Belirtilen modeli bellek verimli şekilde yükler
+        
+        Her model ve cihaz için ağırlıkların tek kopyası tutulur; güvenlik filtresi ve
+        düşük bellek modu istek bazında uygulanır.
+        
+        Args:
+            model_id: Model kimliği (AVAILABLE_MODELS içinde tanımlı)
+            device: "cuda", "mps", "cpu" veya alternatif CPU motoru ("cpu-onnx", "cpu-openvino")
+            safety_checker: Güvenlik filtresinin kullanılıp kullanılmayacağı
+            low_memory: Düşük bellek modu aktifleştirilsin mi?
+            scheduler: Örnekleyici adı (None ise varsayılan)
+            quantize: "int8" ise CPU için kuantize ağırlıklar kullanılır (None ise varsayılan ayar)
+            token_merging: Token birleştirme oranı (None ise model/genel varsayılan, 0: kapalı)
+        """
+        return self.get_task_pipeline("txt2img", model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+    
+    def load_img2img_model(self, model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+        """Img2Img modeli yükle"""
+        return self.get_task_pipeline("img2img", model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+    
+    def load_inpaint_model(self, model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+        """Inpaint modeli yükle"""
+        return self.get_task_pipeline("inpaint", model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+    
+    def preload_models(self, model_ids=None, device=None, resolutions=((512, 512),), warmup_steps=2, low_memory=False, background=True):
+        """
+        Modelleri başlangıçta yükler ve her çözünürlük için kısa bir ısınma üretimi yapar
+        
+        İlk kullanıcı isteğinin model yükleme ve ilk çalıştırma (kernel seçimi) maliyetini
+        ödememesi için kullanılır. İlerleme get_readiness() ile izlenebilir.
+        
+        Args:
+            model_ids: Yüklenecek model kimlikleri (None ise varsayılan model)
+            device: "cuda", "cpu" veya CPU motoru (None ise isteklerin kullandığı cihaz)
+            resolutions: Isınma üretimi yapılacak (genişlik, yükseklik) listesi
+            warmup_steps: Isınma üretimindeki diffusion adımı sayısı
+            low_memory: Düşük bellek modu
+            background: True ise arka planda çalışır
+        """
+        model_ids = list(model_ids or [self.get_default_model_id()])
+        self.readiness = {
+            "state": "loading",
+            "models": {model_id: "pending" for model_id in model_ids},
+            "error": None
+        }
+        
+        if background:
+            thread = threading.Thread(
+                target=self._run_preload,
+                args=(model_ids, device, resolutions, warmup_steps, low_memory),
+                name="model-preload",
+                daemon=True
+            )
+            thread.start()
+            return thread
+        
+        self._run_preload(model_ids, device, resolutions, warmup_steps, low_memory)
+        return None
+    
+    def _run_preload(self, model_ids, device, resolutions, warmup_steps, low_memory):
+        """Ön yükleme ve ısınma işlemini çalıştırır"""
+        start_time = time.time()
+        # İsteklerle aynı önbellek girdisi ısınsın diye cihaz istek yoluyla aynı şekilde seçilir
+        device = device or self.get_request_device()
+        
+        for model_id in model_ids:
+            self.readiness["models"][model_id] = "loading"
+            try:
+                # Isınma, aynı modeli kullanan isteklerle aynı anda çalışmaz
+                with self.pipeline_session("txt2img", model_id, device, safety_checker=False, low_memory=low_memory) as pipe:
+                    if pipe is None:
+                        raise RuntimeError("model yüklenemedi")
+                    
+                    self.readiness["models"][model_id] = "warming"
+                    for width, height in resolutions:
+                        warmup_start = time.time()
+                        with torch.inference_mode():
+                            pipe(
+                                prompt="warmup",
+                                num_inference_steps=warmup_steps,
+                                width=width,
+                                height=height
+                            )
+                        logger.info(f"Isınma tamamlandı: {model_id} {width}x{height} ({time.time() - warmup_start:.2f} saniye)")
+                
+                self.readiness["models"][model_id] = "ready"
+            except Exception as e:
+                logger.error(f"Ön yükleme hatası ({model_id}): {e}")
+                self.readiness["models"][model_id] = "error"
+                self.readiness["error"] = str(e)
+        
+        if any(state == "ready" for state in self.readiness["models"].values()):
+            self.readiness["state"] = "ready"
+        else:
+            self.readiness["state"] = "error"
+        
+        logger.info(f"Ön yükleme bitti ({time.time() - start_time:.2f} saniye): {self.readiness['models']}")
+    
+    def get_readiness(self):
+        """Ön yükleme durumunu döndürür (yük dengeleyici ve arayüz için)"""
+        readiness = dict(self.readiness, models=dict(self.readiness["models"]))
+        readiness["ready"] = readiness["state"] == "ready"
+        return readiness
+    
+    def pin_model(self, model_id):
+        """Modeli sabitler; sabitlenmiş modeller önbellekten çıkarılmaz"""
+        self.model_cache.pinned.add(model_id)
+        logger.info(f"Model sabitlendi: {model_id}")
+    
+    def unpin_model(self, model_id):
+        """Model sabitlemesini kaldırır"""
+        self.model_cache.pinned.discard(model_id)
+        logger.info(f"Model sabitlemesi kaldırıldı: {model_id}")
+    
+    def get_cache_stats(self):
+        """Model önbelleği isabet/ıskalama/çıkarma sayaçlarını döndürür"""
+        stats = self.model_cache.get_stats()
+        stats["shared_components"] = dict(self.sharing_stats, resident=len(self.shared_components))
+        stats["prompt_embeddings"] = self.prompt_embeddings.get_stats()
+        stats["init_latents"] = self.init_latents.get_stats()
+        return stats
+    
+    def _get_vae_fingerprint(self, cache_key, vae):
+        """VAE'nin içerik özetini döndürür (model başına bir kez hesaplanır)"""
+        fingerprint = self.vae_fingerprints.get(cache_key)
+        if fingerprint is None:
+            fingerprint = fingerprint_component(vae)
+            self.vae_fingerprints[cache_key] = fingerprint
+        return fingerprint
+    
+    def encode_init_image(self, pipe, image):
+        """
+        img2img başlangıç görselinin latent'ini önbellekten veya VAE kodlayıcısıyla üretir
+        
+        Args:
+            pipe: load_img2img_model ile alınmış pipeline
+            image (PIL.Image): Başlangıç görseli
+            
+        Returns:
+            torch.Tensor: Ölçeklenmiş latent (pipeline'a image olarak verilir) - desteklenmiyorsa None
+        """
+        cache_key = self.pipeline_keys.get(pipe)
+        # CPU motorları (ONNX/OpenVINO) torch VAE kullanmaz
+        vae = getattr(pipe, "vae", None)
+        if cache_key is None or not isinstance(vae, torch.nn.Module) or not hasattr(pipe, "image_processor"):
+            return None
+        
+        try:
+            return self.init_latents.encode(pipe, image, self._get_vae_fingerprint(cache_key, vae))
+        except Exception as e:
+            logger.warning(f"Başlangıç latent'i hesaplanamadı, görsel doğrudan kullanılacak: {e}")
+            return None
+    
+    def encode_prompts(self, pipe, prompts, negative_prompts=None):
+        """
+        Prompt embedding'lerini önbellekten veya text encoder ile üretir
+        
+        Args:
+            pipe: load_model ile alınmış pipeline
+            prompts (list): Prompt'lar
+            negative_prompts (list): Negatif prompt'lar (None ise guidance kapalı, hesaplanmaz)
+            
+        Returns:
+            tuple: (prompt_embeds, negative_prompt_embeds) - desteklenmiyorsa (None, None)
+        """
+        cache_key = self.pipeline_keys.get(pipe)
+        # CPU motorları (ONNX/OpenVINO) torch text encoder kullanmaz
+        text_encoder = getattr(pipe, "text_encoder", None)
+        if cache_key is None or not hasattr(pipe, "encode_prompt") or not isinstance(text_encoder, torch.nn.Module):
+            return None, None
+        
+        state = self.lora_states.get(cache_key, {})
+        lora_state = state.get("active")
+        device = getattr(pipe, "_execution_device", pipe.device)
+        
+        texts = list(prompts) + list(negative_prompts or [])
+        embeddings = self.prompt_embeddings.encode(pipe, cache_key, texts, device, lora_state)
+        
+        stats = self.prompt_embeddings.get_stats()
+        logger.debug(f"Prompt embedding önbelleği: isabet oranı {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+        
+        prompt_embeds = embeddings[:len(prompts)]
+        negative_prompt_embeds = embeddings[len(prompts):] if negative_prompts else None
+        return prompt_embeds, negative_prompt_embeds
+    
     def download_lora(self, lora_id):
         """LoRA dosyasını indir"""
         if lora_id not in AVAILABLE_LORAS:
@@ -334,6 +1539,145 @@ class ModelManager:
             logger.error(f"LoRA indirilirken hata oluştu: {e}")
             return None
     
+    def _make_components_private(self, cache_key, pipe, names):
+        """
+        Paylaşılan bileşenleri modele özel hale getirir (yazarken kopyala)
+        
+        LoRA katmanları bileşenlerin içine eklendiğinden, paylaşım kaydındaki bir bileşen
+        (başka bir model kullanıyor veya o sırada yüklenen bir model alabilir) önce
+        kopyalanır. Özgün kopya değişmeden kayıtta kalır.
+        """
+        for name in names:
+            component = getattr(pipe, name, None)
+            if component is None:
+                continue
+            
+            with self._load_lock:
+                if not any(shared is component for shared in self.shared_components.values()):
+                    continue
+                private = copy.deepcopy(component)
+                for task_pipe in [pipe] + list(self.task_pipelines.get(cache_key, {}).values()):
+                    task_pipe.register_modules(**{name: private})
+                for key, other in self.model_cache.items():
+                    if key == cache_key:
+                        other.register_modules(**{name: private})
+            logger.info(f"Paylaşılan {name} LoRA için modele özel kopyalandı: {cache_key}")
+    
+    def _deactivate_loras(self, pipe, state):
+        """
+        Birleştirilmiş LoRA'yı ayırır ve yüklü adaptörleri devre dışı bırakır
+        
+        Etkin LoRA yoksa hiçbir şey yapılmaz. Adaptör olarak kullanılan LoRA'nın ardışık
+        kullanım sayacı korunur; yalnızca birleştirilmiş ağırlıklar ayrıldığında sıfırlanır
+        (LoRA'sız isteklerle dönüşümlü trafikte ağırlıklar sürekli yeniden yazılmasın).
+        """
+        if state["fused"]:
+            pipe.unfuse_lora()
+            state["fused"] = None
+            state["streak"] = (None, 0)
+        if state["active"] and state["loaded"]:
+            pipe.disable_lora()
+        state["active"] = None
+    
+    def apply_lora(self, pipe, lora_id=None, weight=None):
+        """
+        Pipeline için istek bazında LoRA adaptörünü etkinleştirir veya kapatır
+        
+        Her adaptör model başına bir kez, LoRA kimliğiyle adlandırılarak yüklenir. Aynı
+        (LoRA, ağırlık) kombinasyonu ardışık isteklerde sık kullanılıyorsa UNet ağırlıklarına
+        birleştirilir (fuse) ve adaptör hesaplaması tamamen atlanır.
+        
+        Args:
+            pipe: load_model ile alınmış pipeline
+            lora_id: LoRA kimliği (None ise tüm adaptörler kapatılır)
+            weight: LoRA ağırlığı (None ise AVAILABLE_LORAS içindeki değer)
+            
+        Returns:
+            bool: LoRA etkinse (veya kapatma başarılıysa) True
+        """
+        cache_key = self.pipeline_keys.get(pipe)
+        
+        # Adaptörler paylaşılan UNet'i değiştirdiğinden aynı modeldeki çalışan isteklerin bitmesi beklenir
+        with self.execution_lock(pipe):
+            state = self.lora_states.setdefault(cache_key, {"loaded": set(), "active": None, "fused": None, "streak": (None, 0)})
+            
+            # Adlandırılmış adaptör desteği olmayan eski diffusers sürümleri
+            if not hasattr(pipe, "set_adapters"):
+                if lora_id and lora_id not in state["loaded"]:
+                    lora_path = self.download_lora(lora_id)
+                    if not lora_path or not hasattr(pipe, "load_lora_weights"):
+                        return False
+                    logger.warning("Bu diffusers sürümü adaptör değiştirmeyi desteklemiyor, LoRA kalıcı olarak yüklendi")
+                    pipe.load_lora_weights(lora_path)
+                    state["loaded"].add(lora_id)
+                    # Eski sürümlerde LoRA kapatılamadığından text encoder hep bu durumdadır
+                    state["active"] = tuple(sorted(state["loaded"]))
+                return bool(lora_id) and lora_id in state["loaded"]
+            
+            if not lora_id:
+                self._deactivate_loras(pipe, state)
+                return True
+            
+            if weight is None:
+                weight = AVAILABLE_LORAS.get(lora_id, {}).get("weight", 1.0)
+            combo = (lora_id, weight)
+            
+            # Birleştirilmiş ağırlıklar zaten bu kombinasyona ait
+            if state["fused"] == combo:
+                state["active"] = combo
+                logger.info(f"Birleştirilmiş LoRA kullanılıyor: {lora_id} ({weight})")
+                return True
+            
+            if state["fused"]:
+                pipe.unfuse_lora()
+                state["fused"] = None
+            
+            if lora_id not in state["loaded"]:
+                lora_path = self.download_lora(lora_id)
+                if not lora_path:
+                    self._deactivate_loras(pipe, state)
+                    return False
+                self._make_components_private(cache_key, pipe, ("text_encoder",))
+                pipe.load_lora_weights(lora_path, adapter_name=lora_id)
+                state["loaded"].add(lora_id)
+                logger.info(f"LoRA adaptörü yüklendi: {lora_id} ({cache_key})")
+            
+            pipe.enable_lora()
+            pipe.set_adapters([lora_id], adapter_weights=[weight])
+            state["active"] = combo
+            
+            streak_combo, streak = state["streak"]
+            streak = streak + 1 if streak_combo == combo else 1
+            state["streak"] = (combo, streak)
+            
+            if self.lora_fuse_threshold and streak >= self.lora_fuse_threshold:
+                try:
+                    pipe.fuse_lora(lora_scale=1.0, adapter_names=[lora_id])
+                    state["fused"] = combo
+                    logger.info(f"Sık kullanılan LoRA UNet ağırlıklarına birleştirildi: {lora_id} ({weight})")
+                except Exception as e:
+                    logger.warning(f"LoRA birleştirilemedi, adaptör olarak kullanılacak: {e}")
+            
+            return True
+    
+    def unload_lora(self, pipe, lora_id):
+        """LoRA adaptörünü modelden tamamen kaldırır"""
+        cache_key = self.pipeline_keys.get(pipe)
+        
+        with self.execution_lock(pipe):
+            state = self.lora_states.get(cache_key)
+            if not state or lora_id not in state["loaded"]:
+                return False
+            if state["fused"] and state["fused"][0] == lora_id:
+                pipe.unfuse_lora()
+                state["fused"] = None
+            pipe.delete_adapters(lora_id)
+            state["loaded"].discard(lora_id)
+            if state.get("active") and state["active"][0] == lora_id:
+                state["active"] = None
+            logger.info(f"LoRA adaptörü kaldırıldı: {lora_id} ({cache_key})")
+            return True
+    
     def apply_lora_to_prompt(self, prompt, lora_id):
         """Prompt'a LoRA tetikleyicilerini ekle"""
         if lora_id not in AVAILABLE_LORAS:
@@ -353,11 +1697,59 @@ class ModelManager:
 model_manager = ModelManager()
 
 # Dışa aktarılacak fonksiyonlar
-def load_model(model_id=None, device=None, safety_checker=True, low_memory=False):
-    return model_manager.load_model(model_id, device, safety_checker, low_memory)
+def load_model(model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+    return model_manager.load_model(model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+
+def load_img2img_model(model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+    return model_manager.load_img2img_model(model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+
+def load_inpaint_model(model_id=None, device=None, safety_checker=True, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+    return model_manager.load_inpaint_model(model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+
+def pipeline_session(task, model_id=None, device=None, safety_checker=False, low_memory=False, scheduler=None, quantize=None, token_merging=None):
+    return model_manager.pipeline_session(task, model_id, device, safety_checker, low_memory, scheduler, quantize, token_merging)
+
+def execution_lock(pipe):
+    return model_manager.execution_lock(pipe)
+
+def list_available_schedulers():
+    return model_manager.list_schedulers()
 
-def load_img2img_model(model_id=None, device=None, safety_checker=True, low_memory=False):
-    return model_manager.load_img2img_model(model_id, device, safety_checker, low_memory)
+def get_recommended_steps(scheduler=None):
+    return model_manager.get_recommended_steps(scheduler)
+
+def get_cpu_device():
+    return model_manager.get_cpu_device()
+
+def get_request_device():
+    return model_manager.get_request_device()
+
+def set_cpu_backend(backend=None):
+    model_manager.set_cpu_backend(backend)
+
+def set_default_quantization(quantize=None):
+    model_manager.set_default_quantization(quantize)
+
+def set_compile_mode(enabled=True):
+    model_manager.set_compile_mode(enabled)
+
+def set_cpu_offload(enabled=True):
+    model_manager.set_cpu_offload(enabled)
+
+def set_token_merging(ratio, model_id=None):
+    model_manager.set_token_merging(ratio, model_id)
+
+def resolve_token_merging(model_id=None, token_merging=None):
+    return model_manager.resolve_token_merging(model_id, token_merging)
+
+def get_output_settings(model_id, device, width, height, low_memory=False, quantize=None):
+    return model_manager.get_output_settings(model_id, device, width, height, low_memory, quantize)
+
+def get_pipeline_model_id(pipe):
+    return model_manager.get_pipeline_model_id(pipe)
+
+def prepare_compiled_shape(pipe, width, height, batch_size=1):
+    return model_manager.prepare_compiled_shape(pipe, width, height, batch_size)
 
 def list_available_models():
     return model_manager.list_models()
@@ -368,15 +1760,51 @@ def list_available_loras():
 def get_prompt_suggestions(model_id=None):
     return model_manager.get_prompt_suggestions(model_id)
 
+def get_default_model_id():
+    return model_manager.get_default_model_id()
+
+def get_default_scheduler():
+    return model_manager.get_default_scheduler()
+
+def configure_vae_memory(pipe, width, height):
+    return model_manager.configure_vae_memory(pipe, width, height)
+
 def download_lora(lora_id):
     return model_manager.download_lora(lora_id)
 
 def apply_lora_to_prompt(prompt, lora_id):
     return model_manager.apply_lora_to_prompt(prompt, lora_id)
 
+def apply_lora(pipe, lora_id=None, weight=None):
+    return model_manager.apply_lora(pipe, lora_id, weight)
+
+def unload_lora(pipe, lora_id):
+    return model_manager.unload_lora(pipe, lora_id)
+
 def download_all_models():
     model_manager.download_models()
 
+def preload_models(model_ids=None, device=None, resolutions=((512, 512),), warmup_steps=2, low_memory=False, background=True):
+    return model_manager.preload_models(model_ids, device, resolutions, warmup_steps, low_memory, background)
+
+def get_readiness():
+    return model_manager.get_readiness()
+
+def pin_model(model_id):
+    model_manager.pin_model(model_id)
+
+def unpin_model(model_id):
+    model_manager.unpin_model(model_id)
+
+def get_cache_stats():
+    return model_manager.get_cache_stats()
+
+def encode_prompts(pipe, prompts, negative_prompts=None):
+    return model_manager.encode_prompts(pipe, prompts, negative_prompts)
+
+def encode_init_image(pipe, image):
+    return model_manager.encode_init_image(pipe, image)
+
 # Kullanım örneği
 if __name__ == "__main__":
     print("Kullanılabilir modeller:")
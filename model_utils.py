@@ -1,11 +1,70 @@
 import os
 import json
+import shutil
+import hashlib
 import torch
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Tek dosyalık checkpoint'lerin diffusers formatına dönüştürülmüş kopyaları
+CONVERTED_CACHE_DIR = Path(os.path.expanduser("~/.cache/imggenai/converted"))
+HASH_INDEX_PATH = CONVERTED_CACHE_DIR / "hash_index.json"
+
+def get_file_hash(file_path):
+    """
+    Dosyanın SHA256 özetini döndürür
+    
+    Büyük checkpoint'leri her seferinde yeniden okumamak için özet, dosyanın boyutu
+    ve değiştirilme zamanıyla birlikte indeks dosyasında saklanır.
+    """
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    
+    index = {}
+    if HASH_INDEX_PATH.exists():
+        try:
+            with open(HASH_INDEX_PATH, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except Exception as e:
+            logger.warning(f"Özet indeksi okunamadı: {e}")
+    
+    entry = index.get(str(file_path))
+    if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+        return entry["sha256"]
+    
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(16 * 1024 * 1024), b""):
+            hasher.update(chunk)
+    file_hash = hasher.hexdigest()
+    
+    index[str(file_path)] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_hash}
+    HASH_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(HASH_INDEX_PATH, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=4)
+    
+    return file_hash
+
+def get_converted_model_dir(model_path, torch_dtype):
+    """Checkpoint'in dönüştürülmüş kopyasının önbellek dizinini döndürür"""
+    dtype_name = str(torch_dtype).replace("torch.", "")
+    return CONVERTED_CACHE_DIR / f"{get_file_hash(model_path)}_{dtype_name}"
+
+def save_converted_model(pipe, converted_dir):
+    """Dönüştürülmüş pipeline'ı safetensors olarak kaydeder (yarım kalan kayıtlar kullanılmaz)"""
+    tmp_dir = converted_dir.with_name(converted_dir.name + ".tmp")
+    try:
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        pipe.save_pretrained(tmp_dir, safe_serialization=True)
+        os.replace(tmp_dir, converted_dir)
+        logger.info(f"Dönüştürülmüş model önbelleğe kaydedildi: {converted_dir}")
+    except Exception as e:
+        logger.warning(f"Dönüştürülmüş model kaydedilemedi: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
 def get_models_registry():
     """Kayıtlı modellerin listesini al"""
     registry_path = Path(os.path.expanduser("~/.cache/imggenai/models_registry.json"))
@@ -98,12 +157,26 @@ def load_custom_model(model_name="ponyRealism"):
         
         logger.info(f"{model_name} modeli yükleniyor: {model_path}")
         
-        # Modeli yükle
-        pipe = StableDiffusionPipeline.from_single_file(
-            model_path,
-            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-            use_safetensors=model_path.endswith(".safetensors")
-        )
+        torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
+        converted_dir = get_converted_model_dir(model_path, torch_dtype)
+        
+        if (converted_dir / "model_index.json").exists():
+            # Daha önce dönüştürülmüş kopyayı yükle (safetensors dosyaları bellek eşlemeli okunur)
+            logger.info(f"Dönüştürülmüş model önbellekten yükleniyor: {converted_dir}")
+            pipe = StableDiffusionPipeline.from_pretrained(
+                converted_dir,
+                torch_dtype=torch_dtype,
+                use_safetensors=True,
+                local_files_only=True
+            )
+        else:
+            # Modeli yükle ve dönüştürülmüş halini sonraki yüklemeler için kaydet
+            pipe = StableDiffusionPipeline.from_single_file(
+                model_path,
+                torch_dtype=torch_dtype,
+                use_safetensors=model_path.endswith(".safetensors")
+            )
+            save_converted_model(pipe, converted_dir)
         
         # GPU'ya taşı
         if torch.cuda.is_available():
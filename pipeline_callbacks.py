@@ -0,0 +1,260 @@
+"""
+Bu modül, diffusion pipeline'larının adım sonu geri çağrılarını (step callback) yönetir.
+
+Birden fazla geri çağrı tek bir zincirde birleştirilir ve pipeline'ın desteklediği
+arayüze (callback_on_step_end veya eski callback/callback_steps) bağlanır. Ara
+adımlarda VAE çözümlemesi yapmadan, latent'lerden doğrusal bir izdüşümle ucuz
+önizleme görselleri üretilir. İptal belirteçleri ve süre sınırları da her adımda
+bu zincir üzerinden kontrol edilir.
+"""
+
+import time
+import inspect
+import logging
+import threading
+import numpy as np
+import torch
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# SD 1.x/2.x VAE latent kanallarından yaklaşık RGB değerine doğrusal izdüşüm
+LATENT_RGB_FACTORS = [
+    [0.3512, 0.2297, 0.3227],
+    [0.3250, 0.4974, 0.2350],
+    [-0.2829, 0.1762, 0.2721],
+    [-0.2120, -0.2616, -0.7177]
+]
+
+# Varsayılan önizleme aralığı (adım)
+DEFAULT_PREVIEW_STEPS = 5
+
+class GenerationCancelled(Exception):
+    """Üretim iptal edildiğinde veya süresi dolduğunda fırlatılır"""
+
+    def __init__(self, reason="cancelled"):
+        self.reason = reason
+        message = "Üretim zaman aşımına uğradı" if reason == "timeout" else "Üretim iptal edildi"
+        super().__init__(message)
+
+class CancellationToken:
+    """
+    Üretimi dışarıdan iptal etmek için kullanılan belirteç
+
+    Her denoising adımında kontrol edilir. timeout verilirse bu süre dolduğunda
+    üretim kendiliğinden iptal edilir.
+    """
+
+    def __init__(self, timeout=None):
+        self.deadline = time.time() + timeout if timeout else None
+        self._event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason="cancelled"):
+        """Üretimi iptal eder"""
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.deadline and time.time() > self.deadline:
+            self.cancel("timeout")
+        return self._event.is_set()
+
+    def check(self):
+        """İptal edildiyse GenerationCancelled fırlatır"""
+        if self.cancelled:
+            raise GenerationCancelled(self.reason)
+
+class CombinedCancellationToken(CancellationToken):
+    """Toplu üretimde tüm isteklerin belirteçleri iptal edildiğinde iptal olan belirteç"""
+
+    def __init__(self, tokens):
+        super().__init__()
+        self.tokens = list(tokens)
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and self.tokens and all(token.cancelled for token in self.tokens):
+            self.cancel(self.tokens[0].reason)
+        return self._event.is_set()
+
+def latents_to_preview(latents, index=0, size=None):
+    """
+    Latent tensöründen VAE kullanmadan önizleme görseli üretir
+
+    Args:
+        latents: [batch, 4, h, w] latent tensörü (torch veya numpy)
+        index: Önizlemesi alınacak batch elemanı
+        size: (genişlik, yükseklik) - None ise latent boyutunun 8 katı
+
+    Returns:
+        PIL.Image: Önizleme görseli
+    """
+    latent = torch.as_tensor(latents[index]).detach().float().cpu()
+    factors = torch.tensor(LATENT_RGB_FACTORS, dtype=latent.dtype)
+    rgb = torch.einsum("chw,cr->hwr", latent, factors)
+    rgb = ((rgb + 1.0) / 2.0).clamp(0, 1).mul(255).round().to(torch.uint8).numpy()
+
+    image = Image.fromarray(np.ascontiguousarray(rgb))
+    if size is None:
+        size = (image.width * 8, image.height * 8)
+    return image.resize(size, Image.BILINEAR)
+
+class StepCallbackChain:
+    """
+    Adım sonu geri çağrılarını sırayla çalıştıran zincir
+
+    Her geri çağrı fn(pipe, step, timestep, callback_kwargs) imzasına sahiptir ve
+    callback_kwargs içindeki tensörleri değiştirmek için bir sözlük döndürebilir.
+    """
+
+    def __init__(self):
+        self.callbacks = []
+        self.tensor_inputs = ["latents"]
+
+    def add(self, callback, tensor_inputs=None):
+        """Zincire geri çağrı ekler (gereken ek tensör girdileriyle birlikte)"""
+        self.callbacks.append(callback)
+        for name in tensor_inputs or []:
+            if name not in self.tensor_inputs:
+                self.tensor_inputs.append(name)
+        return self
+
+    def __bool__(self):
+        return bool(self.callbacks)
+
+    def _on_step_end(self, pipe, step, timestep, callback_kwargs):
+        for callback in self.callbacks:
+            updates = callback(pipe, step, timestep, callback_kwargs)
+            if updates:
+                callback_kwargs.update(updates)
+        return callback_kwargs
+
+    def _legacy_callback(self, step, timestep, latents):
+        # Eski arayüzde tensörler değiştirilemez, yalnızca okunur
+        callback_kwargs = {"latents": latents}
+        for callback in self.callbacks:
+            callback(None, step, timestep, callback_kwargs)
+
+    def as_pipeline_kwargs(self, pipe):
+        """
+        Zinciri pipeline çağrısı için uygun anahtar kelime argümanlarına dönüştürür
+
+        Returns:
+            dict: pipe(...) çağrısına eklenecek argümanlar (desteklenmiyorsa boş)
+        """
+        if not self.callbacks:
+            return {}
+
+        parameters = inspect.signature(pipe.__call__).parameters
+        if "callback_on_step_end" in parameters:
+            supported = getattr(pipe, "_callback_tensor_inputs", self.tensor_inputs)
+            return {
+                "callback_on_step_end": self._on_step_end,
+                "callback_on_step_end_tensor_inputs": [name for name in self.tensor_inputs if name in supported]
+            }
+        if "callback" in parameters:
+            return {"callback": self._legacy_callback, "callback_steps": 1}
+
+        logger.warning("Pipeline adım geri çağrılarını desteklemiyor")
+        return {}
+
+def make_cancellation_callback(cancel_token):
+    """Her adımda iptal belirtecini kontrol eden geri çağrı oluşturur"""
+    def callback(pipe, step, timestep, callback_kwargs):
+        cancel_token.check()
+        return None
+
+    return callback
+
+def make_timing_callback(step_times):
+    """
+    Her adımın süresini step_times listesine ekleyen geri çağrı oluşturur
+
+    İlk ölçüm pipeline çağrısının başından (ilk adımın sonuna kadar) alınır; bu yüzden
+    çağrıdan hemen önce step_times listesi boşaltılmalıdır.
+    """
+    last = {"time": time.perf_counter()}
+
+    def callback(pipe, step, timestep, callback_kwargs):
+        now = time.perf_counter()
+        step_times.append(now - last["time"])
+        last["time"] = now
+        return None
+
+    return callback
+
+def guidance_cutoff_step(total_steps, fraction):
+    """
+    Guidance'ın kapatılacağı adımı döndürür
+
+    Args:
+        total_steps: Gerçekte çalışacak denoising adımı sayısı
+        fraction: Guidance'ın uygulanacağı adım oranı (0-1 arası, None/1: kesme yok)
+
+    Returns:
+        int: Bu adımdan sonra guidance kapatılır (kesme yoksa None)
+    """
+    if not fraction or fraction >= 1 or total_steps < 2:
+        return None
+    return min(max(1, round(total_steps * fraction)), total_steps - 1)
+
+def make_guidance_cutoff_callback(cutoff_step):
+    """
+    cutoff_step adımından sonra classifier-free guidance'ı kapatan geri çağrı oluşturur
+
+    Koşulsuz dal prompt_embeds'ten çıkarılır ve kalan adımlarda UNet yarı batch ile
+    çalışır. Yalnızca callback_on_step_end arayüzünde (prompt_embeds değiştirilebilir
+    olduğunda) etkilidir; zincire "prompt_embeds" tensör girdisiyle eklenmelidir.
+    """
+    def callback(pipe, step, timestep, callback_kwargs):
+        if pipe is None or step + 1 != cutoff_step or "prompt_embeds" not in callback_kwargs:
+            return None
+        # prompt_embeds = [koşulsuz, koşullu]; koşullu yarı kalır
+        pipe._guidance_scale = 0.0
+        return {"prompt_embeds": callback_kwargs["prompt_embeds"].chunk(2)[-1]}
+
+    return callback
+
+def summarize_guidance_cutoff(step_times, cutoff_step):
+    """
+    Guidance kesme öncesi ve sonrası adım hızlarını özetleyen log metni döndürür
+
+    İlk adım pipeline hazırlığını da içerdiğinden ortalamaya katılmaz.
+    """
+    before = step_times[1:cutoff_step] or step_times[:cutoff_step]
+    after = step_times[cutoff_step:]
+    if not before or not after:
+        return "adım süresi ölçülemedi"
+    before_rate = len(before) / sum(before)
+    after_rate = len(after) / sum(after)
+    return (
+        f"guidance ile {before_rate:.2f} adım/sn, kesme sonrası {len(after)} adım "
+        f"{after_rate:.2f} adım/sn ({after_rate / before_rate:.2f}x)"
+    )
+
+def make_preview_callback(on_preview, total_steps, every_n_steps=DEFAULT_PREVIEW_STEPS, size=None):
+    """
+    Her N adımda bir latent önizlemesi üreten geri çağrı oluşturur
+
+    Args:
+        on_preview: fn(index, step, total_steps, image) - batch'teki her görsel için çağrılır
+        total_steps: Toplam adım sayısı (ilerleme gösterimi için)
+        every_n_steps: Önizleme aralığı
+        size: Önizleme boyutu (genişlik, yükseklik)
+    """
+    def callback(pipe, step, timestep, callback_kwargs):
+        step_number = step + 1
+        if step_number % every_n_steps != 0 or step_number >= total_steps:
+            return None
+        latents = callback_kwargs["latents"]
+        try:
+            for index in range(len(latents)):
+                on_preview(index, step_number, total_steps, latents_to_preview(latents, index, size))
+        except Exception as e:
+            logger.debug(f"Önizleme üretilemedi: {e}")
+        return None
+
+    return callback
@@ -0,0 +1,88 @@
+"""
+Bu modül, text encoder çıktılarını (prompt embedding) LRU önbellekte saklar.
+
+Tekrarlanan prompt'lar, boş/negatif prompt'lar, stil ekleri ve LoRA tetikleyicileri
+için CLIP text encoder yeniden çalıştırılmaz; önbellekteki embedding doğrudan
+pipeline'a prompt_embeds / negative_prompt_embeds olarak verilir.
+"""
+
+import logging
+import threading
+import torch
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Önbellekte tutulacak en fazla embedding sayısı (SD 1.5 için her biri ~120-240 KB)
+DEFAULT_MAX_ENTRIES = 512
+
+class PromptEmbeddingCache:
+    """(model, tokenizer, metin, LoRA durumu) anahtarlı LRU embedding önbelleği"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def encode(self, pipe, cache_key, texts, device, lora_state=None):
+        """
+        Metinlerin embedding'lerini önbellekten veya text encoder ile üretir
+
+        Args:
+            pipe: Torch tabanlı diffusers pipeline'ı (encode_prompt desteklemeli)
+            cache_key: Model önbellek anahtarı
+            texts (list): Kodlanacak metinler
+            device: Embedding'lerin üretileceği cihaz
+            lora_state: Etkin LoRA kombinasyonu (text encoder çıktısını değiştirir)
+
+        Returns:
+            torch.Tensor: [len(texts), token, boyut] embedding'ler
+        """
+        tokenizer = getattr(pipe, "tokenizer", None)
+        tokenizer_id = getattr(tokenizer, "name_or_path", None) or type(tokenizer).__name__
+        keys = [(cache_key, tokenizer_id, text, lora_state) for text in texts]
+
+        embeddings = {}
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    embeddings[key] = self.entries[key]
+            self.stats["hits"] += sum(1 for key in keys if key in embeddings)
+
+        # Önbellekte olmayan metinleri tek bir çağrıda kodla
+        missing = list(OrderedDict.fromkeys(key for key in keys if key not in embeddings))
+        if missing:
+            with torch.inference_mode():
+                encoded, _ = pipe.encode_prompt(
+                    [key[2] for key in missing],
+                    device,
+                    1,
+                    False
+                )
+            with self.lock:
+                self.stats["misses"] += len(missing)
+                for key, embedding in zip(missing, encoded):
+                    embeddings[key] = embedding
+                    self.entries[key] = embedding
+                    self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+
+        return torch.stack([embeddings[key] for key in keys])
+
+    def invalidate(self, cache_key):
+        """Önbellekten çıkarılan modelin embedding'lerini siler"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == cache_key]:
+                del self.entries[key]
+
+    def get_stats(self):
+        """İsabet oranı ve önbellek boyutunu döndürür"""
+        with self.lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self.entries)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
@@ -0,0 +1,97 @@
+"""
+Bu modül, CPU çıkarımı için text encoder ve UNet bileşenlerine dinamik int8
+kuantizasyon uygular.
+
+Linear (ve attention projeksiyonu) katmanlarının ağırlıkları int8 olarak saklanır,
+aktivasyonlar çalışma anında kuantize edilir. Kuantize edilmiş bileşenler diskte
+saklanır; sonraki yüklemelerde fp32 ağırlıklar hiç yüklenmeden doğrudan kullanılır.
+"""
+
+import os
+import hashlib
+import logging
+import torch
+import diffusers
+import transformers
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Kuantize edilmiş bileşenlerin önbellek dizini
+QUANTIZED_CACHE_DIR = Path(os.path.expanduser("~/.cache/imggenai/quantized"))
+
+# Kuantize edilen bileşenler ve desteklenen modlar
+QUANTIZE_COMPONENTS = ("text_encoder", "unet")
+QUANTIZATION_MODES = ("int8",)
+
+def get_quantized_cache_dir(model_id, repo_id, revision):
+    """
+    Modelin kuantize edilmiş bileşenlerinin önbellek dizinini döndürür
+
+    Anahtar, yükleme yolundan (hub/yerel snapshot) bağımsız olarak depo ve snapshot
+    revizyonundan üretilir. Bileşenler tam modül olarak saklandığından torch, diffusers
+    veya transformers sürümü değişince (sınıf yapısı değişebilir) eski dosyalar kullanılmaz.
+    """
+    versions = f"{torch.__version__}|{diffusers.__version__}|{transformers.__version__}"
+    key = hashlib.sha256(f"{repo_id}|{revision}|{versions}".encode()).hexdigest()[:16]
+    return QUANTIZED_CACHE_DIR / model_id / key
+
+def load_quantized_components(cache_dir, skip=()):
+    """
+    Önbellekteki kuantize edilmiş bileşenleri yükler
+
+    Args:
+        skip: Yüklenmeyecek bileşen adları (ör. bellekte paylaşılan kopyası olanlar)
+
+    Returns:
+        dict: {bileşen adı: modül} - from_pretrained'e doğrudan verilebilir
+    """
+    components = {}
+    for name in QUANTIZE_COMPONENTS:
+        if name in skip:
+            continue
+        path = Path(cache_dir) / f"{name}_int8.pt"
+        if not path.exists():
+            continue
+        try:
+            # Modül yapısı kuantize katmanlar içerdiğinden tam modül olarak saklanır
+            components[name] = torch.load(path, map_location="cpu", weights_only=False)
+            logger.info(f"Kuantize edilmiş {name} önbellekten yüklendi: {path}")
+        except Exception as e:
+            logger.warning(f"Kuantize edilmiş {name} yüklenemedi, yeniden kuantize edilecek: {e}")
+    return components
+
+def quantize_pipeline_int8(pipe, cache_dir):
+    """
+    Pipeline'ın text encoder ve UNet Linear katmanlarına dinamik int8 kuantizasyon uygular
+
+    Önbellekten gelen (zaten kuantize) bileşenler atlanır; yeni kuantize edilenler
+    sonraki yüklemeler için diske kaydedilir.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    for name in QUANTIZE_COMPONENTS:
+        component = getattr(pipe, name, None)
+        if component is None or getattr(component, "_imggenai_quantized", False):
+            continue
+
+        quantized = torch.ao.quantization.quantize_dynamic(
+            component,
+            {torch.nn.Linear},
+            dtype=torch.qint8,
+            inplace=True
+        )
+        quantized._imggenai_quantized = True
+        pipe.register_modules(**{name: quantized})
+
+        path = cache_dir / f"{name}_int8.pt"
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            torch.save(quantized, tmp_path)
+            os.replace(tmp_path, path)
+            logger.info(f"{name} int8 olarak kuantize edildi ve kaydedildi: {path}")
+        except Exception as e:
+            logger.warning(f"Kuantize edilmiş {name} kaydedilemedi: {e}")
+
+    return pipe
@@ -0,0 +1,141 @@
+"""
+Bu modül, üretilen görselleri tüm üretim parametreleri ve tohum ile anahtarlanmış
+bir disk önbelleğinde saklar.
+
+Aynı tohum ve parametrelerle tekrarlanan istekler model hiç çalıştırılmadan
+diskten sunulur. Önbellek boyutu sınırı aşılınca en uzun süre kullanılmayan
+sonuçlar silinir.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+logger = logging.getLogger(__name__)
+
+# Sonuç önbelleği dizini ve boyut sınırı (GB, ortam değişkeniyle değiştirilebilir)
+RESULT_CACHE_DIR = Path(os.path.expanduser("~/.cache/imggenai/results"))
+RESULT_CACHE_SIZE_ENV = "IMGGENAI_RESULT_CACHE_GB"
+DEFAULT_RESULT_CACHE_GB = 2
+
+class ResultCache:
+    """Parametre anahtarlı, boyut sınırlı disk görsel önbelleği"""
+
+    def __init__(self, cache_dir=RESULT_CACHE_DIR, max_bytes=None):
+        self.cache_dir = Path(cache_dir)
+        if max_bytes is None:
+            max_bytes = float(os.environ.get(RESULT_CACHE_SIZE_ENV, DEFAULT_RESULT_CACHE_GB)) * (1024**3)
+        self.max_bytes = max_bytes
+        self.enabled = max_bytes > 0
+        self.lock = threading.Lock()
+        self.total_bytes = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(**params):
+        """Parametrelerden kararlı bir önbellek anahtarı üretir"""
+        payload = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def get(self, key):
+        """
+        Önbellekteki görseli döndürür
+
+        Returns:
+            PIL.Image: Görsel (info["seed"] içinde tohum) veya bulunamazsa None
+        """
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            image = Image.open(path)
+            image.load()
+        except FileNotFoundError:
+            with self.lock:
+                self.stats["misses"] += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Önbellekteki sonuç okunamadı, silinecek: {e}")
+            path.unlink(missing_ok=True)
+            with self.lock:
+                self.stats["misses"] += 1
+                self.total_bytes = None
+            return None
+
+        # Son kullanım zamanını güncelle (LRU silme sırası için)
+        os.utime(path)
+        if "seed" in image.info:
+            image.info["seed"] = int(image.info["seed"])
+        with self.lock:
+            self.stats["hits"] += 1
+        return image
+
+    def put(self, key, image, seed, params=None):
+        """Görseli tohum ve parametreleriyle birlikte önbelleğe yazar"""
+        if not self.enabled or image is None:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        metadata = PngInfo()
+        metadata.add_text("seed", str(seed))
+        if params:
+            metadata.add_text("parameters", json.dumps(params, sort_keys=True, default=str))
+
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            image.save(tmp_path, format="PNG", pnginfo=metadata)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Sonuç önbelleğe yazılamadı: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += path.stat().st_size
+            self._evict_until_within_budget()
+
+    def _evict_until_within_budget(self):
+        """Boyut sınırı aşıldıysa en uzun süre kullanılmayan sonuçları siler"""
+        if self.total_bytes is None:
+            self.total_bytes = sum(path.stat().st_size for path in self.cache_dir.rglob("*.png"))
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        files = sorted(self.cache_dir.rglob("*.png"), key=lambda path: path.stat().st_mtime)
+        for path in files:
+            if self.total_bytes <= self.max_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self.total_bytes -= size
+            self.stats["evictions"] += 1
+        logger.info(f"Sonuç önbelleği küçültüldü: {self.total_bytes / (1024**2):.1f} MB")
+
+    def clear(self):
+        """Tüm önbelleği siler"""
+        with self.lock:
+            for path in self.cache_dir.rglob("*.png"):
+                path.unlink(missing_ok=True)
+            self.total_bytes = 0
+
+    def get_stats(self):
+        """İsabet/ıskalama/silme sayaçlarını döndürür"""
+        with self.lock:
+            stats = dict(self.stats)
+        total = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / total if total else 0.0
+        return stats
+
+# Uygulama genelinde kullanılan sonuç önbelleği
+result_cache = ResultCache()
@@ -15,8 +15,11 @@ from pathlib import Path
 from model_manager import (
     list_available_models, 
     load_model, 
-    list_available_loras
+    list_available_loras,
+    get_default_model_id
 )
+from cpu_backends import list_cpu_backends, make_backend_generator
+import numpy as np
 
 # Loglama ayarları
 logging.basicConfig(
@@ -141,12 +144,309 @@ def test_all_models(prompt="an astronaut riding a horse on mars", output_dir="te
     
     return results
 
+def benchmark_cpu_backends(model_id=None, prompt="a beautiful landscape with mountains", num_steps=20, runs=3, output_dir="test_outputs"):
+    """PyTorch CPU yolunu kurulu alternatif CPU motorlarıyla karşılaştırır"""
+    print("\n==== CPU Motoru Karşılaştırması ====")
+    
+    model_id = model_id or get_default_model_id()
+    devices = ["cpu"] + list_cpu_backends()
+    if len(devices) == 1:
+        print("⚠️ Kurulu alternatif CPU motoru yok (pip install optimum[onnxruntime] veya optimum[openvino])")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    results = {}
+    
+    for device in devices:
+        logger.info(f"'{model_id}' modeli {device} ile ölçülüyor...")
+        try:
+            start_time = time.time()
+            pipe = load_model(model_id=model_id, device=device)
+            load_time = time.time() - start_time
+            
+            if pipe is None:
+                logger.error(f"❌ '{model_id}' modeli {device} ile yüklenemedi!")
+                continue
+            
+            timings = []
+            for run in range(runs):
+                generator = make_backend_generator(42) if device != "cpu" else torch.Generator(device="cpu").manual_seed(42)
+                start_time = time.time()
+                with torch.inference_mode():
+                    result = pipe(
+                        prompt=prompt,
+                        guidance_scale=7.5,
+                        num_inference_steps=num_steps,
+                        generator=generator
+                    )
+                timings.append(time.time() - start_time)
+            
+            result.images[0].save(f"{output_dir}/benchmark_{model_id}_{device}.png")
+            
+            # İlk çalıştırma ısınma olarak sayılır
+            steady = timings[1:] or timings
+            results[device] = {
+                "load": load_time,
+                "first": timings[0],
+                "average": sum(steady) / len(steady)
+            }
+        except Exception as e:
+            logger.error(f"❌ {device} ölçümü başarısız: {e}")
+    
+    print(f"\n{'Motor':<15}{'Yükleme (s)':>14}{'İlk (s)':>12}{'Ortalama (s)':>15}{'s/adım':>10}{'Hızlanma':>10}")
+    baseline = results.get("cpu", {}).get("average")
+    for device, result in results.items():
+        speedup = f"{baseline / result['average']:.2f}x" if baseline else "-"
+        print(f"{device:<15}{result['load']:>14.2f}{result['first']:>12.2f}{result['average']:>15.2f}{result['average'] / num_steps:>10.3f}{speedup:>10}")
+    
+    return results
+
+# Kuantizasyon kalite karşılaştırması için sabit prompt seti
+QUALITY_PROMPTS = [
+    "a photograph of an astronaut riding a horse on mars, high quality",
+    "a professional photograph of a mountain landscape, Alps, sunset, detailed",
+    "portrait of a smiling woman with blue eyes, professional lighting, high quality"
+]
+
+def compare_images(reference, candidate):
+    """İki görsel arasındaki ortalama mutlak farkı ve PSNR değerini hesaplar"""
+    ref = np.asarray(reference, dtype=np.float32)
+    cand = np.asarray(candidate, dtype=np.float32)
+    mse = float(np.mean((ref - cand) ** 2))
+    psnr = float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+    return float(np.mean(np.abs(ref - cand))), psnr
+
+def benchmark_quantization(model_id=None, num_steps=20, output_dir="test_outputs"):
+    """fp32 CPU yolunu int8 kuantize yol ile hız, bellek ve kalite açısından karşılaştırır"""
+    print("\n==== int8 Kuantizasyon Karşılaştırması ====")
+    
+    model_id = model_id or get_default_model_id()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    from model_manager import model_manager, measure_pipeline_footprint
+    
+    images = {}
+    timings = {}
+    footprints = {}
+    
+    for mode in (None, "int8"):
+        label = mode or "fp32"
+        pipe = load_model(model_id=model_id, device="cpu", quantize=mode)
+        if pipe is None:
+            logger.error(f"❌ '{model_id}' modeli {label} olarak yüklenemedi!")
+            return None
+        
+        footprints[label] = measure_pipeline_footprint(pipe)["ram"] / (1024**3)
+        images[label] = []
+        timings[label] = []
+        
+        for idx, prompt in enumerate(QUALITY_PROMPTS):
+            generator = torch.Generator(device="cpu").manual_seed(1234 + idx)
+            start_time = time.time()
+            with torch.inference_mode():
+                result = pipe(
+                    prompt=prompt,
+                    guidance_scale=7.5,
+                    num_inference_steps=num_steps,
+                    generator=generator
+                )
+            timings[label].append(time.time() - start_time)
+            images[label].append(result.images[0])
+            result.images[0].save(f"{output_dir}/quantization_{model_id}_{label}_{idx}.png")
+        
+        # Karşılaştırma sırasında iki kopyanın birlikte bellekte kalmaması için bırak
+        model_manager.model_cache.evict(model_manager.pipeline_keys[pipe])
+        del pipe
+    
+    print(f"\n{'Mod':<8}{'Bellek (GB)':>13}{'Ortalama (s)':>15}{'s/adım':>10}")
+    for label in ("fp32", "int8"):
+        average = sum(timings[label]) / len(timings[label])
+        print(f"{label:<8}{footprints[label]:>13.2f}{average:>15.2f}{average / num_steps:>10.3f}")
+    
+    print("\nKalite farkı (fp32 referans):")
+    for idx, prompt in enumerate(QUALITY_PROMPTS):
+        mae, psnr = compare_images(images["fp32"][idx], images["int8"][idx])
+        print(f"- [{idx}] MAE: {mae:.2f}  PSNR: {psnr:.2f} dB  ({prompt[:40]}...)")
+    
+    return timings
+
+def benchmark_batching(model_id=None, prompt="a beautiful landscape with mountains", num_steps=20, num_images=4, output_dir="test_outputs"):
+    """Tek tek üretimi toplu üretimle görsel/saniye açısından karşılaştırır"""
+    print("\n==== Toplu Üretim Karşılaştırması ====")
+    
+    from txt2img import generate_image_from_text, generate_images_from_text
+    
+    model_id = model_id or get_default_model_id()
+    os.makedirs(output_dir, exist_ok=True)
+    seeds = [1000 + i for i in range(num_images)]
+    
+    # Isınma: model yükleme süresi ölçüme katılmasın
+    generate_image_from_text(prompt, num_steps=1, seed=0, model_id=model_id, use_cache=False)
+    
+    start_time = time.time()
+    for seed in seeds:
+        generate_image_from_text(prompt, num_steps=num_steps, seed=seed, model_id=model_id, use_cache=False)
+    sequential_time = time.time() - start_time
+    
+    start_time = time.time()
+    results = generate_images_from_text([prompt], num_images_per_prompt=num_images, seeds=seeds, num_steps=num_steps, model_id=model_id, use_cache=False)
+    batched_time = time.time() - start_time
+    
+    for result in results:
+        if result["image"]:
+            result["image"].save(f"{output_dir}/batch_{model_id}_{result['seed']}.png")
+    
+    print(f"\n{'Yöntem':<10}{'Süre (s)':>12}{'Görsel/sn':>12}")
+    print(f"{'Tek tek':<10}{sequential_time:>12.2f}{num_images / sequential_time:>12.3f}")
+    print(f"{'Toplu':<10}{batched_time:>12.2f}{num_images / batched_time:>12.3f}")
+    print(f"Hızlanma: {sequential_time / batched_time:.2f}x")
+    
+    return {"sequential": sequential_time, "batched": batched_time}
+
+def benchmark_fast_mode(model_id=None, prompt="a beautiful landscape with mountains", num_steps=20, output_dir="test_outputs"):
+    """Normal ve hızlı (UNet özellik önbellekli) modları adım başına süre ve kalite açısından karşılaştırır"""
+    print("\n==== Hızlı Mod Karşılaştırması ====")
+    
+    from deepcache import deepcache, QUALITY_MODES
+    from pipeline_callbacks import StepCallbackChain, make_timing_callback
+    
+    model_id = model_id or get_default_model_id()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    os.makedirs(output_dir, exist_ok=True)
+    
+    pipe = load_model(model_id=model_id, device=device)
+    if pipe is None:
+        logger.error(f"❌ '{model_id}' modeli yüklenemedi!")
+        return None
+    
+    # Isınma
+    with torch.inference_mode():
+        pipe(prompt=prompt, num_inference_steps=2)
+    
+    images = {}
+    step_times = {}
+    for mode in ("normal", "fast"):
+        step_times[mode] = []
+        callbacks = StepCallbackChain().add(make_timing_callback(step_times[mode]))
+        generator = torch.Generator(device=device).manual_seed(42)
+        with torch.inference_mode(), deepcache(pipe, QUALITY_MODES[mode]):
+            result = pipe(
+                prompt=prompt,
+                guidance_scale=7.5,
+                num_inference_steps=num_steps,
+                generator=generator,
+                **callbacks.as_pipeline_kwargs(pipe)
+            )
+        images[mode] = result.images[0]
+        images[mode].save(f"{output_dir}/fast_mode_{model_id}_{mode}.png")
+    
+    print(f"\n{'Mod':<8}{'Toplam (s)':>12}{'s/adım':>10}{'En hızlı adım':>16}{'En yavaş adım':>16}")
+    for mode, times in step_times.items():
+        print(f"{mode:<8}{sum(times):>12.2f}{sum(times) / len(times):>10.3f}{min(times):>16.3f}{max(times):>16.3f}")
+    
+    print("\nAdım süreleri (s):")
+    for mode, times in step_times.items():
+        print(f"- {mode}: " + " ".join(f"{t:.2f}" for t in times))
+    
+    mae, psnr = compare_images(images["normal"], images["fast"])
+    print(f"\nHızlanma: {sum(step_times['normal']) / sum(step_times['fast']):.2f}x")
+    print(f"Kalite farkı (normal referans): MAE {mae:.2f}, PSNR {psnr:.2f} dB")
+    
+    return step_times
+
+def benchmark_token_merging(model_id=None, prompt="a beautiful landscape with mountains", num_steps=20, ratios=(0.0, 0.3, 0.5), size=768, output_dir="test_outputs"):
+    """Token birleştirme oranlarını yüksek çözünürlükte gecikme ve kalite açısından karşılaştırır"""
+    print(f"\n==== Token Birleştirme Karşılaştırması ({size}x{size}) ====")
+    
+    from model_manager import TOMESD_AVAILABLE
+    if not TOMESD_AVAILABLE:
+        print("❌ tomesd kurulu değil. Yüklemek için: pip install tomesd")
+        return None
+    
+    model_id = model_id or get_default_model_id()
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    os.makedirs(output_dir, exist_ok=True)
+    
+    images = {}
+    timings = {}
+    for ratio in ratios:
+        pipe = load_model(model_id=model_id, device=device, token_merging=ratio)
+        if pipe is None:
+            logger.error(f"❌ '{model_id}' modeli yüklenemedi!")
+            return None
+        
+        # Isınma: yama sonrası ilk çağrı ölçüme katılmasın
+        with torch.inference_mode():
+            pipe(prompt=prompt, num_inference_steps=2, width=size, height=size)
+        
+        generator = torch.Generator(device=device).manual_seed(42)
+        start_time = time.time()
+        with torch.inference_mode():
+            result = pipe(
+                prompt=prompt,
+                guidance_scale=7.5,
+                num_inference_steps=num_steps,
+                width=size,
+                height=size,
+                generator=generator
+            )
+        timings[ratio] = time.time() - start_time
+        images[ratio] = result.images[0]
+        images[ratio].save(f"{output_dir}/tome_{model_id}_{ratio:.1f}.png")
+    
+    # Sonraki üretimler model varsayılanıyla çalışsın
+    load_model(model_id=model_id, device=device, token_merging=0)
+    
+    baseline = ratios[0]
+    print(f"\n{'Oran':<8}{'Süre (s)':>10}{'s/adım':>10}{'Hızlanma':>10}{'MAE':>8}{'PSNR (dB)':>11}")
+    for ratio in ratios:
+        mae, psnr = compare_images(images[baseline], images[ratio])
+        print(f"{ratio:<8.1f}{timings[ratio]:>10.2f}{timings[ratio] / num_steps:>10.3f}{timings[baseline] / timings[ratio]:>9.2f}x{mae:>8.2f}{psnr:>11.2f}")
+    
+    return timings
+
+def benchmark_hires(model_id=None, prompt="a beautiful landscape with mountains", num_steps=20, size=1024, hires_scale=2.0, output_dir="test_outputs"):
+    """Doğrudan yüksek çözünürlüklü üretimi iki aşamalı hi-res moduyla süre açısından karşılaştırır"""
+    print(f"\n==== Hi-res Modu Karşılaştırması ({size}x{size}) ====")
+    
+    from txt2img import generate_image_from_text
+    
+    model_id = model_id or get_default_model_id()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Isınma: model yükleme süresi ölçüme katılmasın
+    generate_image_from_text(prompt, num_steps=1, seed=0, model_id=model_id, use_cache=False)
+    
+    timings = {}
+    for label, scale in (("doğrudan", None), ("hi-res", hires_scale)):
+        start_time = time.time()
+        image = generate_image_from_text(
+            prompt, num_steps=num_steps, width=size, height=size, seed=42,
+            model_id=model_id, use_cache=False, hires_scale=scale
+        )
+        timings[label] = time.time() - start_time
+        if image:
+            image.save(f"{output_dir}/hires_{model_id}_{'direct' if scale is None else 'twopass'}.png")
+    
+    print(f"\n{'Yöntem':<10}{'Süre (s)':>12}")
+    for label, elapsed in timings.items():
+        print(f"{label:<10}{elapsed:>12.2f}")
+    print(f"Hızlanma: {timings['doğrudan'] / timings['hi-res']:.2f}x")
+    
+    return timings
+
 def main():
     """Ana fonksiyon"""
     parser = argparse.ArgumentParser(description="AI Görsel Oluşturma Model Test Aracı")
     parser.add_argument("--model", "-m", type=str, help="Test edilecek belirli bir model ID'si")
     parser.add_argument("--prompt", "-p", type=str, default="a beautiful landscape with mountains", help="Test için kullanılacak prompt")
     parser.add_argument("--output", "-o", type=str, default="test_outputs", help="Test görsellerinin kaydedileceği dizin")
+    parser.add_argument("--benchmark-backends", action="store_true", help="PyTorch CPU ile ONNX Runtime / OpenVINO motorlarını karşılaştır")
+    parser.add_argument("--benchmark-quantization", action="store_true", help="fp32 ve int8 CPU yollarını hız, bellek ve kalite açısından karşılaştır")
+    parser.add_argument("--benchmark-batch", action="store_true", help="Tek tek ve toplu üretimi görsel/saniye açısından karşılaştır")
+    parser.add_argument("--benchmark-fast", action="store_true", help="Normal ve hızlı kalite modlarını adım başına süre ve kalite açısından karşılaştır")
+    parser.add_argument("--benchmark-tome", action="store_true", help="Token birleştirme oranlarını 768px'te gecikme ve kalite açısından karşılaştır")
+    parser.add_argument("--benchmark-hires", action="store_true", help="1024px'te doğrudan üretimi iki aşamalı hi-res moduyla karşılaştır")
+    parser.add_argument("--steps", type=int, default=20, help="Karşılaştırma testlerindeki diffusion adımı sayısı")
     args = parser.parse_args()
     
     print("=" * 50)
@@ -162,8 +462,26 @@ def main():
     output_dir = Path(args.output)
     output_dir.mkdir(exist_ok=True, parents=True)
     
+    # CPU motoru karşılaştırması
+    if args.benchmark_backends:
+        benchmark_cpu_backends(args.model, args.prompt, args.steps, output_dir=args.output)
+    # int8 kuantizasyon karşılaştırması
+    elif args.benchmark_quantization:
+        benchmark_quantization(args.model, args.steps, args.output)
+    # Toplu üretim karşılaştırması
+    elif args.benchmark_batch:
+        benchmark_batching(args.model, args.prompt, args.steps, output_dir=args.output)
+    # Hızlı mod karşılaştırması
+    elif args.benchmark_fast:
+        benchmark_fast_mode(args.model, args.prompt, args.steps, args.output)
+    # Token birleştirme karşılaştırması
+    elif args.benchmark_tome:
+        benchmark_token_merging(args.model, args.prompt, args.steps, output_dir=args.output)
+    # Hi-res modu karşılaştırması
+    elif args.benchmark_hires:
+        benchmark_hires(args.model, args.prompt, args.steps, output_dir=args.output)
     # Belirli bir model test edilecek mi?
-    if args.model:
+    elif args.model:
         models = list_available_models()
         if args.model in models:
             test_model(args.model, args.prompt, args.output)
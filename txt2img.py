@@ -1,11 +1,24 @@
 import torch
 import gc
 import os
+import math
 import time  # Eksik import eklendi
 import logging
-from PIL import Image
+from PIL import Image, ImageOps
 import numpy as np
-from model_manager import load_model, get_prompt_suggestions, apply_lora_to_prompt, download_lora
+from model_manager import (
+    load_img2img_model, pipeline_session, get_prompt_suggestions, apply_lora_to_prompt, apply_lora, get_recommended_steps,
+    get_request_device, prepare_compiled_shape, encode_prompts, get_default_model_id, get_default_scheduler,
+    configure_vae_memory, resolve_token_merging, get_output_settings, get_pipeline_model_id
+)
+from cpu_backends import is_cpu_backend, make_backend_generator
+from result_cache import result_cache
+from utils import PeakMemoryMonitor
+from deepcache import deepcache, QUALITY_MODES
+from pipeline_callbacks import (
+    StepCallbackChain, make_preview_callback, make_cancellation_callback, make_timing_callback, GenerationCancelled,
+    DEFAULT_PREVIEW_STEPS, guidance_cutoff_step, make_guidance_cutoff_callback, summarize_guidance_cutoff
+)
 
 # Loglama ayarları
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,18 +47,107 @@ def optimize_torch_for_device():
         # CPU optimizasyonları
         torch.set_num_threads(os.cpu_count())  # Tüm CPU çekirdeklerini kullan
 
+# Toplu üretimde parça boyutu için referans değerler (512x512, CFG dahil)
+BATCH_CHUNK_SIZES = {"cuda": 4, "cpu": 2}
+
+# Hi-res modunda iyileştirme geçişinin varsayılan adım sayısı ve değişim miktarı
+DEFAULT_HIRES_STEPS = 10
+DEFAULT_HIRES_STRENGTH = 0.35
+
+def _hires_base_size(width, height, hires_scale):
+    """Hi-res modunda taban geçişin çözünürlüğünü (8'in katı) döndürür"""
+    return (
+        max(64, int(width / hires_scale) // 8 * 8),
+        max(64, int(height / hires_scale) // 8 * 8)
+    )
+
+def _default_chunk_size(device, width, height, low_memory=False):
+    """Belleğe sığacak toplu üretim parça boyutunu çözünürlüğe göre tahmin eder"""
+    if low_memory or is_cpu_backend(device):
+        return 1
+    base = BATCH_CHUNK_SIZES["cuda" if device == "cuda" else "cpu"]
+    return max(1, int(base * (512 * 512) / (width * height)))
+
+def _apply_request_lora(pipe, lora_id):
+    """
+    İstek için LoRA durumunu ayarlar (model çalıştırma kilidi tutulurken çağrılır)
+    
+    Returns:
+        bool: LoRA uygulandı mı
+    """
+    # LoRA adaptasyonunu etkinleştir (LoRA yoksa önceki isteklerden kalan adaptörleri kapat)
+    lora_applied = False
+    try:
+        if lora_id:
+            logger.info(f"LoRA uygulanıyor: {lora_id}")
+            if apply_lora(pipe, lora_id):
+                logger.info("LoRA başarıyla uygulandı")
+                lora_applied = True
+        else:
+            apply_lora(pipe, None)
+    except Exception as e:
+        logger.error(f"LoRA uygulama hatası: {e}")
+    
+    return lora_applied
+
+def _make_generator(device, seed):
+    """Cihaza uygun rastgele sayı üretecini oluşturur"""
+    if is_cpu_backend(device):
+        return make_backend_generator(seed)
+    return torch.Generator(device=device).manual_seed(seed)
+
+def _refine_hires(refine_pipe, latents, prompt_args, guidance_scale, width, height, generators, hires_steps, hires_strength, cancel_token=None):
+    """
+    Taban geçişin latent'lerini büyütüp img2img ile kısa bir iyileştirme geçişinden geçirir
+    
+    Latent'ler doğrudan img2img'e verildiğinden VAE kodlayıcısı çalışmaz; VAE yalnızca
+    son çözünürlükte bir kez çözümleme yapar.
+    """
+    scale_factor = getattr(refine_pipe, "vae_scale_factor", 8)
+    latents = torch.nn.functional.interpolate(
+        latents, size=(height // scale_factor, width // scale_factor), mode="bilinear", align_corners=False
+    )
+    
+    callbacks = StepCallbackChain()
+    if cancel_token:
+        cancel_token.check()
+        callbacks.add(make_cancellation_callback(cancel_token))
+    
+    # img2img yalnızca num_inference_steps * strength adım çalıştırır
+    return refine_pipe(
+        **prompt_args,
+        image=latents,
+        strength=hires_strength,
+        guidance_scale=guidance_scale,
+        num_inference_steps=max(hires_steps, math.ceil(hires_steps / hires_strength)),
+        generator=generators if len(generators) > 1 else generators[0],
+        **callbacks.as_pipeline_kwargs(refine_pipe)
+    )
+
 # Metin açıklamasından görsel üret
 def generate_image_from_text(
     prompt, 
     guidance_scale=7.5, 
-    num_steps=50, 
+    num_steps=None, 
     width=512, 
     height=512, 
     seed=None,
     model_id=None,
     lora_id=None,
     low_memory=False,
-    debug=False
+    debug=False,
+    scheduler=None,
+    negative_prompt="",
+    use_cache=True,
+    preview_callback=None,
+    preview_steps=DEFAULT_PREVIEW_STEPS,
+    cancel_token=None,
+    quality="normal",
+    token_merging=None,
+    guidance_cutoff=None,
+    hires_scale=None,
+    hires_steps=DEFAULT_HIRES_STEPS,
+    hires_strength=DEFAULT_HIRES_STRENGTH
 ):
     """
     Metin açıklamasından görsel oluşturur
@@ -53,7 +155,7 @@ def generate_image_from_text(
     Args:
         prompt (str): Görsel açıklaması
         guidance_scale (float): Classifier-Free Guidance (CFG) değeri
-        num_steps (int): Diffusion adımı sayısı
+        num_steps (int): Diffusion adımı sayısı (None ise örnekleyici için önerilen değer)
         width (int): Görsel genişliği (512 veya 768 önerilir)
         height (int): Görsel yüksekliği (512 veya 768 önerilir)
         seed (int): Rastgele sayı üreteci tohumu (yinelenebilirlik için)
@@ -61,96 +163,349 @@ def generate_image_from_text(
         lora_id (str): Kullanılacak LoRA ID'si (opsiyonel)
         low_memory (bool): Düşük bellek modu
         debug (bool): Debug modu açık mı?
+        scheduler (str): Örnekleyici adı (AVAILABLE_SCHEDULERS içinde tanımlı, None ise varsayılan)
+        negative_prompt (str): İstenmeyen özelliklerin belirtildiği metin
+        use_cache (bool): False ise sonuç önbelleği atlanır (her zaman yeniden üretilir)
+        preview_callback: fn(adım, toplam adım, önizleme görseli) - ara adım önizlemeleri için
+        preview_steps (int): Önizleme aralığı (adım)
+        cancel_token (CancellationToken): İptal/süre sınırı belirteci (her adımda kontrol edilir)
+        quality (str): "normal" veya "fast" (UNet derin özellikleri adımlar arasında yeniden kullanılır)
+        token_merging (float): Token birleştirme oranı (None ise model varsayılanı, 0: kapalı; 768px ve üzerinde hızlandırır)
+        guidance_cutoff (float): Guidance'ın uygulanacağı adım oranı (örn. 0.7: son %30 adım guidance'sız,
+            yarı UNet maliyetiyle çalışır; None/1: kapalı)
+        hires_scale (float): Hi-res modu ölçeği (örn. 2.0: width/2 x height/2 çözünürlükte üretilir, latent
+            uzayında büyütülüp img2img ile kısa bir iyileştirme geçişinden geçirilir; None/1: kapalı)
+        hires_steps (int): Hi-res iyileştirme geçişinin adım sayısı
+        hires_strength (float): Hi-res iyileştirme geçişinin değişim miktarı (düşük değer kompozisyonu korur)
+        
+    Returns:
+        PIL.Image: Oluşturulan görsel (kullanılan tohum image.info["seed"] içinde)
+        
+    Raises:
+        GenerationCancelled: Üretim iptal edildiğinde veya süresi dolduğunda
+    """
+    logger.info(f"Görsel oluşturuluyor: '{prompt}'")
+    results = generate_images_from_text(
+        [prompt],
+        seeds=None if seed is None else [seed],
+        guidance_scale=guidance_scale,
+        num_steps=num_steps,
+        width=width,
+        height=height,
+        model_id=model_id,
+        lora_id=lora_id,
+        low_memory=low_memory,
+        debug=debug,
+        scheduler=scheduler,
+        negative_prompt=negative_prompt,
+        chunk_size=1,
+        use_cache=use_cache,
+        preview_callback=(lambda index, step, total, image: preview_callback(step, total, image)) if preview_callback else None,
+        preview_steps=preview_steps,
+        cancel_token=cancel_token,
+        quality=quality,
+        token_merging=token_merging,
+        guidance_cutoff=guidance_cutoff,
+        hires_scale=hires_scale,
+        hires_steps=hires_steps,
+        hires_strength=hires_strength
+    )
+    return results[0]["image"] if results else None
+
+# Birden fazla metin açıklamasından toplu görsel üret
+def generate_images_from_text(
+    prompts,
+    num_images_per_prompt=1,
+    seeds=None,
+    guidance_scale=7.5,
+    num_steps=None,
+    width=512,
+    height=512,
+    model_id=None,
+    lora_id=None,
+    low_memory=False,
+    debug=False,
+    scheduler=None,
+    negative_prompt="",
+    chunk_size=None,
+    use_cache=True,
+    preview_callback=None,
+    preview_steps=DEFAULT_PREVIEW_STEPS,
+    cancel_token=None,
+    quality="normal",
+    token_merging=None,
+    guidance_cutoff=None,
+    hires_scale=None,
+    hires_steps=DEFAULT_HIRES_STEPS,
+    hires_strength=DEFAULT_HIRES_STRENGTH
+):
+    """
+    Birden fazla görseli tek bir toplu (batched) denoising döngüsünde oluşturur
+    
+    Her görselin kendi tohumu vardır; aynı tohumla tek tek üretilen görselle aynı
+    sonucu verir. Görseller belleğe sığacak parçalara bölünerek üretilir.
+    
+    Args:
+        prompts (list): Görsel açıklamaları (tek bir str de verilebilir)
+        num_images_per_prompt (int): Her açıklama için üretilecek görsel sayısı
+        seeds (list): Her görsel için tohum (None ise rastgele, tek int ise ardışık tohumlar)
+        chunk_size (int): Tek seferde üretilecek görsel sayısı (None ise cihaz ve çözünürlüğe göre)
+        use_cache (bool): False ise sonuç önbelleği atlanır
+        preview_callback: fn(görsel sırası, adım, toplam adım, önizleme görseli) - ara adım önizlemeleri
+        preview_steps (int): Önizleme aralığı (adım)
+        cancel_token (CancellationToken): İptal/süre sınırı belirteci
+        quality (str): "normal" veya "fast"
+        token_merging (float): Token birleştirme oranı (None ise model varsayılanı)
+        guidance_cutoff (float): Guidance'ın uygulanacağı adım oranı (None/1: kapalı)
+        hires_scale, hires_steps, hires_strength: İki aşamalı hi-res modu (width/height son çözünürlüktür)
+        Diğer parametreler generate_image_from_text ile aynıdır
         
     Returns:
-        PIL.Image: Oluşturulan görsel
+        list: {"prompt", "seed", "image"} sözlükleri (görsel üretilemezse "image" None)
+        
+    Raises:
+        GenerationCancelled: Üretim iptal edildiğinde veya süresi dolduğunda
     """
     try:
         start_time = time.time()
-        logger.info(f"Görsel oluşturuluyor: '{prompt}'")
-
-        # Cihaz belirleme - GPU yoksa CPU kullan
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        if isinstance(prompts, str):
+            prompts = [prompts]
         
-        # İlerlemeyi logla
-        logger.info(f"Model yükleniyor: {model_id if model_id else 'default'} - Cihaz: {device}")
+        # Her görsel için (prompt, tohum) çiftlerini oluştur
+        items = [prompt for prompt in prompts for _ in range(num_images_per_prompt)]
+        if seeds is None:
+            seeds = [int(torch.randint(0, 2147483647, (1,)).item()) for _ in items]
+        elif isinstance(seeds, int):
+            seeds = [seeds + i for i in range(len(items))]
+        if len(seeds) != len(items):
+            logger.error(f"Tohum sayısı ({len(seeds)}) görsel sayısıyla ({len(items)}) eşleşmiyor")
+            return []
         
-        # Modeli yükle
-        pipe = load_model(model_id, device, safety_checker=True, low_memory=low_memory)
+        logger.info(f"{len(items)} görsel oluşturuluyor ({len(prompts)} prompt)")
         
-        if pipe is None:
-            logger.error("Model yüklenemedi")
-            return None
+        # Cihaz belirleme - GPU yoksa CPU (veya seçili CPU motoru) kullan
+        device = get_request_device()
         
-        # LoRA adaptasyonu ekle
-        if lora_id:
-            try:
-                logger.info(f"LoRA uygulanıyor: {lora_id}")
-                lora_path = download_lora(lora_id)
-                if lora_path:
-                    # LoRA yükleme mümkünse
-                    if hasattr(pipe, "load_lora_weights"):
-                        pipe.load_lora_weights(lora_path)
-                        logger.info("LoRA başarıyla uygulandı")
-                    else:
-                        logger.warning("Bu model doğrudan LoRA yüklemeyi desteklemiyor")
-                    
-                    # Prompt'a LoRA tetikleyicilerini ekle
-                    prompt = apply_lora_to_prompt(prompt, lora_id)
-            except Exception as e:
-                logger.error(f"LoRA uygulama hatası: {e}")
-        
-        # Rastgele tohum değeri
-        if seed is not None:
-            generator = torch.Generator(device=device).manual_seed(seed)
-        else:
-            generator = torch.Generator(device=device).manual_seed(int(torch.randint(0, 2147483647, (1,)).item()))
+        # Adım sayısı verilmemişse örnekleyicinin önerdiği değeri kullan
+        if num_steps is None:
+            num_steps = get_recommended_steps(scheduler)
+        
+        if quality not in QUALITY_MODES:
+            logger.warning(f"Bilinmeyen kalite modu: {quality}, normal mod kullanılacak")
+            quality = "normal"
+        
+        # Hi-res modu latent çıktısı gerektirir; CPU motorlarında doğrudan üretilir
+        hires = bool(hires_scale) and hires_scale > 1 and 0 < hires_strength <= 1 and hires_steps > 0
+        if hires and is_cpu_backend(device):
+            logger.warning(f"Hi-res modu {device} motorunda desteklenmiyor, doğrudan üretilecek")
+            hires = False
+        
+        # Token birleştirme görüntüyü değiştirdiğinden geçerli oran önbellek anahtarına girer
+        token_merging = resolve_token_merging(model_id, token_merging)
+        
+        # Sonuç önbelleği: aynı parametre ve tohumla üretilmiş görseller diskten sunulur
+        cache_params = dict(
+            model_id=model_id or get_default_model_id(),
+            lora_id=lora_id,
+            negative_prompt=negative_prompt or "",
+            guidance_scale=float(guidance_scale),
+            num_steps=int(num_steps),
+            width=int(width),
+            height=int(height),
+            scheduler=scheduler or get_default_scheduler(),
+            quality=quality,
+            token_merging=token_merging,
+            guidance_cutoff=guidance_cutoff if guidance_cutoff_step(num_steps, guidance_cutoff) else None,
+            hires=(float(hires_scale), int(hires_steps), float(hires_strength)) if hires else None,
+            device=device,
+            # int8 kuantizasyon ve derleme kovası (yuvarlama + kırpma) da çıktıyı değiştirir
+            **get_output_settings(model_id, device, int(width), int(height), low_memory)
+        )
+        results = [None] * len(items)
+        cache_keys = [result_cache.make_key(prompt=prompt, seed=seed, **cache_params) for prompt, seed in zip(items, seeds)]
+        if use_cache:
+            for index, key in enumerate(cache_keys):
+                image = result_cache.get(key)
+                if image is not None:
+                    results[index] = {"prompt": items[index], "seed": seeds[index], "image": image}
         
-        if debug:
-            logger.debug(f"Parametreler: model={model_id}, adımlar={num_steps}, guidance={guidance_scale}")
+        pending = [index for index, result in enumerate(results) if result is None]
+        if len(pending) < len(items):
+            logger.info(f"{len(items) - len(pending)} görsel sonuç önbelleğinden alındı")
+        if not pending:
+            return results
         
-        # Görseli oluştur
-        # Bellek optimizasyonu için torch.cuda.amp.autocast() kullan
-        with torch.inference_mode():
-            # GPU varsa, low_memory modunda önbellek boşaltma
-            if device == "cuda" and low_memory:
-                torch.cuda.empty_cache()
+        if cancel_token:
+            cancel_token.check()
+        
+        # İlerlemeyi logla
+        logger.info(f"Model yükleniyor: {model_id if model_id else 'default'} - Cihaz: {device}")
+        
+        # Model istek boyunca bu isteğe ayrılır: örnekleyici, LoRA ve bellek modları
+        # denoising sırasında başka bir istek tarafından değiştirilmez
+        with pipeline_session("txt2img", model_id, device, low_memory=low_memory, scheduler=scheduler, token_merging=token_merging) as pipe:
+            if pipe is None:
+                logger.error("Model yüklenemedi")
+                return []
+            
+            # LoRA adaptasyonunu etkinleştir (LoRA yoksa önceki isteklerden kalan adaptörleri kapat)
+            lora_applied = _apply_request_lora(pipe, lora_id)
+            
+            # Sonuçlar gerçekten çalışan model ve LoRA ile önbelleğe yazılır; model varsayılana
+            # düştüyse veya LoRA uygulanamadıysa istenen anahtara temel model görseli yazılmaz
+            ran_model_id = get_pipeline_model_id(pipe) or cache_params["model_id"]
+            ran_lora_id = lora_id if lora_applied else None
+            if (ran_model_id, ran_lora_id) != (cache_params["model_id"], lora_id):
+                logger.warning(f"İstenen model/LoRA kullanılamadı, sonuçlar {ran_model_id} (LoRA: {ran_lora_id}) anahtarıyla önbelleğe yazılacak")
+                cache_params = dict(cache_params, model_id=ran_model_id, lora_id=ran_lora_id)
+                cache_keys = [result_cache.make_key(prompt=prompt, seed=seed, **cache_params) for prompt, seed in zip(items, seeds)]
+            
+            # Hi-res iyileştirme: aynı önbellekteki modelin img2img görünümü (UNet, VAE ve LoRA paylaşılır;
+            # modelin çalıştırma kilidi bu iş parçacığında tutulduğundan ayarları istek boyunca korunur)
+            refine_pipe = None
+            if hires:
+                refine_pipe = load_img2img_model(model_id, device, safety_checker=False, low_memory=low_memory, scheduler=scheduler, token_merging=token_merging)
+                if refine_pipe is None:
+                    logger.warning("Hi-res iyileştirme pipeline'ı yüklenemedi, doğrudan üretilecek")
+                    hires = False
+            
+            # Prompt'lara LoRA tetikleyicilerini ekle
+            prompts_to_run = [items[index] for index in pending]
+            if lora_applied:
+                prompts_to_run = [apply_lora_to_prompt(prompt, lora_id) for prompt in prompts_to_run]
+            
+            if chunk_size is None:
+                chunk_size = _default_chunk_size(device, width, height, low_memory)
+            # CPU motorları görsel başına üreteç listesi kabul etmez, tek tek üretilir
+            if is_cpu_backend(device):
+                chunk_size = 1
             
-            # DiffusionPipeline çağır
-            result = pipe(
-                prompt=prompt,
-                guidance_scale=guidance_scale,
-                num_inference_steps=num_steps,
-                width=width,
-                height=height,
-                generator=generator
-            )
+            if debug:
+                logger.debug(f"Parametreler: model={model_id}, adımlar={num_steps}, guidance={guidance_scale}, örnekleyici={scheduler}, parça={chunk_size}")
+            
+            # Tepe bellek kullanımını istek boyunca ölç
+            memory_monitor = PeakMemoryMonitor(device)
+            with memory_monitor:
+                for offset in range(0, len(pending), chunk_size):
+                    chunk_indices = pending[offset:offset + chunk_size]
+                    chunk_prompts = prompts_to_run[offset:offset + chunk_size]
+                    chunk_seeds = [seeds[index] for index in chunk_indices]
+                    
+                    # Görsel başına üreteç: toplu sonuç, tek tek üretimle aynı olur
+                    generators = [_make_generator(device, seed) for seed in chunk_seeds]
+                    
+                    # Derlenmiş modellerde yeniden derlemeyi önlemek için çözünürlüğü kovaya yuvarla
+                    gen_width, gen_height = prepare_compiled_shape(pipe, width, height, len(chunk_prompts))
+                    base_width, base_height = gen_width, gen_height
+                    if hires:
+                        base_width, base_height = prepare_compiled_shape(
+                            pipe, *_hires_base_size(width, height, hires_scale), len(chunk_prompts)
+                        )
+                    
+                    # Büyük çözünürlüklerde VAE'yi döşemeli/dilimli çalıştır (sabit bellek zarfı)
+                    configure_vae_memory(pipe, gen_width, gen_height)
+                    
+                    # Adım sonu geri çağrıları (iptal kontrolü, ara adım önizlemeleri)
+                    callbacks = StepCallbackChain()
+                    if cancel_token:
+                        cancel_token.check()
+                        callbacks.add(make_cancellation_callback(cancel_token))
+                    if preview_callback:
+                        callbacks.add(make_preview_callback(
+                            lambda position, step, total, image, chunk_indices=chunk_indices: preview_callback(chunk_indices[position], step, total, image),
+                            num_steps,
+                            preview_steps,
+                            (width, height)
+                        ))
+                    
+                    # Guidance kesme: son adımlar koşulsuz dal olmadan çalışır, adım hızı loglanır
+                    cutoff_step = guidance_cutoff_step(num_steps, guidance_cutoff) if guidance_scale > 1 else None
+                    step_times = []
+                    if cutoff_step:
+                        callbacks.add(make_timing_callback(step_times))
+                        callbacks.add(make_guidance_cutoff_callback(cutoff_step), ["prompt_embeds"])
+                    
+                    # Görselleri oluştur (hızlı modda UNet derin özellikleri önbelleklenir)
+                    with torch.inference_mode(), deepcache(pipe, QUALITY_MODES[quality]):
+                        # GPU varsa, low_memory modunda önbellek boşaltma
+                        if device == "cuda" and low_memory:
+                            torch.cuda.empty_cache()
+                    
+                        # Prompt embedding'leri önbellekten al (CPU motorlarında metin doğrudan verilir)
+                        negative_prompts = [negative_prompt or ""] * len(chunk_prompts) if guidance_scale > 1 else None
+                        prompt_embeds, negative_prompt_embeds = encode_prompts(pipe, chunk_prompts, negative_prompts)
+                        if prompt_embeds is not None:
+                            prompt_args = {"prompt_embeds": prompt_embeds, "negative_prompt_embeds": negative_prompt_embeds}
+                        else:
+                            prompt_args = {"prompt": chunk_prompts, "negative_prompt": negative_prompts}
+                    
+                        # DiffusionPipeline çağır (hi-res modunda taban geçiş latent döndürür)
+                        base_start = time.time()
+                        result = pipe(
+                            **prompt_args,
+                            guidance_scale=guidance_scale,
+                            num_inference_steps=num_steps,
+                            width=base_width,
+                            height=base_height,
+                            generator=generators if len(generators) > 1 else generators[0],
+                            output_type="latent" if hires else "pil",
+                            **callbacks.as_pipeline_kwargs(pipe)
+                        )
+                    
+                        if cutoff_step:
+                            logger.info(f"Guidance kesme ({cutoff_step}/{num_steps} adım): {summarize_guidance_cutoff(step_times, cutoff_step)}")
+                        
+                        if hires:
+                            refine_start = time.time()
+                            result = _refine_hires(
+                                refine_pipe, result.images, prompt_args, guidance_scale, gen_width, gen_height,
+                                generators, hires_steps, hires_strength, cancel_token
+                            )
+                            logger.info(
+                                f"Hi-res: {base_width}x{base_height} -> {gen_width}x{gen_height}, taban geçiş "
+                                f"{refine_start - base_start:.2f} sn, iyileştirme {time.time() - refine_start:.2f} sn"
+                            )
+                    
+                    # NSFW denetimi - result.nsfw_content_detected None değilse
+                    if hasattr(result, "nsfw_content_detected") and result.nsfw_content_detected is not None:
+                        try:
+                            # İterasyon yapmadan önce gerçekten iterable olduğunu kontrol et
+                            if isinstance(result.nsfw_content_detected, (list, tuple)) and any(result.nsfw_content_detected):
+                                logger.warning("NSFW içerik tespit edildi, görsel blurlanabilir")
+                        except Exception as e:
+                            logger.debug(f"NSFW denetimi sırasında hata: {e}")
+                    
+                    images = []
+                    if result and hasattr(result, "images") and isinstance(result.images, (list, tuple)):
+                        images = list(result.images)
+                    elif debug:
+                        logger.debug("Result yapısı: " + str(type(result)))
+                    
+                    for position, index in enumerate(chunk_indices):
+                        image = images[position] if position < len(images) else None
+                        if image is not None:
+                            if (gen_width, gen_height) != (width, height):
+                                image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+                            image.info["seed"] = seeds[index]
+                            if use_cache:
+                                result_cache.put(cache_keys[index], image, seeds[index], dict(cache_params, prompt=items[index]))
+                        results[index] = {"prompt": items[index], "seed": seeds[index], "image": image}
         
         elapsed_time = time.time() - start_time
-        logger.info(f"Görsel oluşturuldu: {elapsed_time:.2f} saniye")
-        
-        # NSFW denetimi - result.nsfw_content_detected None değilse
-        if hasattr(result, "nsfw_content_detected") and result.nsfw_content_detected is not None:
-            try:
-                # İterasyon yapmadan önce gerçekten iterable olduğunu kontrol et
-                if isinstance(result.nsfw_content_detected, (list, tuple)) and any(result.nsfw_content_detected):
-                    logger.warning("NSFW içerik tespit edildi, görsel blurlanabilir")
-            except Exception as e:
-                logger.debug(f"NSFW denetimi sırasında hata: {e}")
-        
-        # Görüntüyü döndür
-        if result and hasattr(result, "images") and isinstance(result.images, (list, tuple)) and len(result.images) > 0:
-            return result.images[0]
-        else:
-            if debug:
-                logger.debug("Result yapısı: " + str(type(result)))
-                if result and hasattr(result, "images"):
-                    logger.debug(f"Images tipi: {type(result.images)}")
-            return None
+        logger.info(f"{len(pending)} görsel oluşturuldu: {elapsed_time:.2f} saniye ({len(pending) / elapsed_time:.2f} görsel/sn), tepe bellek: {memory_monitor.summary()}")
         
+        return results
+        
+    except GenerationCancelled as e:
+        reason = e.reason
     except Exception as e:
         logger.error(f"Görsel oluşturma hatası: {e}", exc_info=debug)
-        return None
+        return []
+    
+    # İptal: ara tensörler traceback ile birlikte bırakıldıktan sonra belleği temizle
+    free_gpu_memory()
+    logger.warning(f"Görsel oluşturma durduruldu ({reason}): {time.time() - start_time:.2f} saniye")
+    raise GenerationCancelled(reason)
 
 # Doğrudan çalıştırma testi
 if __name__ == "__main__":
@@ -4,6 +4,7 @@ import os
 import psutil
 import socket
 import logging
+import threading
 from datetime import datetime
 
 # Loglama ayarları
@@ -96,6 +97,69 @@ def format_time(seconds):
     else:
         return f"{seconds}s"
 
+class PeakMemoryMonitor:
+    """
+    Bir işlem süresince tepe bellek kullanımını ölçer (context manager)
+    
+    GPU için PyTorch tepe bellek sayaçları, CPU için işlem RSS değeri arka planda
+    örneklenerek kullanılır. Her iki değer de işlem genelidir; başka bir ölçüm sürerken
+    GPU tepe sayacı sıfırlanmaz ve özet eşzamanlı isteklerin de dahil olduğunu belirtir.
+    """
+    
+    _lock = threading.Lock()
+    _active = 0
+    _entered = 0
+    
+    def __init__(self, device="cpu", interval=0.05):
+        self.device = device
+        self.interval = interval
+        self.peak_ram = 0
+        self.peak_device = 0
+        self.overlapped = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._entry = 0
+    
+    def _sample_ram(self):
+        process = psutil.Process(os.getpid())
+        while True:
+            self.peak_ram = max(self.peak_ram, process.memory_info().rss)
+            if self._stop.wait(self.interval):
+                break
+    
+    def __enter__(self):
+        with PeakMemoryMonitor._lock:
+            # Tepe sayacı yalnızca çalışan başka ölçüm yoksa sıfırlanır
+            self.overlapped = PeakMemoryMonitor._active > 0
+            if not self.overlapped and self.device == "cuda" and torch.cuda.is_available():
+                torch.cuda.reset_peak_memory_stats()
+            PeakMemoryMonitor._active += 1
+            PeakMemoryMonitor._entered += 1
+            self._entry = PeakMemoryMonitor._entered
+        self._thread = threading.Thread(target=self._sample_ram, daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        with PeakMemoryMonitor._lock:
+            self.overlapped = self.overlapped or PeakMemoryMonitor._entered != self._entry
+            PeakMemoryMonitor._active -= 1
+        if self.device == "cuda" and torch.cuda.is_available():
+            self.peak_device = torch.cuda.max_memory_allocated()
+        return False
+    
+    def summary(self):
+        """Tepe bellek değerlerini okunabilir metin olarak döndürür"""
+        text = f"RAM {self.peak_ram / (1024**3):.2f} GB"
+        if self.peak_device:
+            text += f", GPU {self.peak_device / (1024**3):.2f} GB"
+        text += " (işlem geneli"
+        if self.overlapped:
+            text += ", eşzamanlı istekler dahil"
+        return text + ")"
+
 def configure_environment():
     """Çalışma ortamı için optimum ayarları yapılandırır"""
     # CUDA cihazı varsa optimizasyon yap
@@ -3,7 +3,7 @@ import torch
 import logging
 from PIL import Image
 import numpy as np
-from txt2img import generate_image_from_text
+from txt2img import generate_image_from_text, generate_images_from_text
 from img2img import generate_image_from_image
 from model_manager import list_available_models, list_available_loras
 
@@ -80,31 +80,32 @@ def run_style_transfer_workflow(prompt):
         "pencil sketch style"
     ]
     
-    images = []
-    
-    # Her stil için bir görsel oluştur
+    # Her stilin hangi modele daha uygun olduğunu belirle ve aynı modeldekileri grupla
+    model_prompts = {}
     for style in styles:
         styled_prompt = f"{prompt}, {style}, high quality"
-        
+        if "anime" in style or "digital" in style:
+            model_id = "flux-uncensored"
+        else:
+            model_id = "pony-realism-v21"
+        model_prompts.setdefault(model_id, []).append(styled_prompt)
+    
+    images = []
+    
+    # Her model için stilleri tek bir toplu üretimde oluştur
+    for model_id, styled_prompts in model_prompts.items():
         try:
-            # Her stilin hangi modele daha uygun olduğunu belirle
-            if "anime" in style or "digital" in style:
-                model_id = "flux-uncensored"
-            else:
-                model_id = "pony-realism-v21"
-                
-            image = generate_image_from_text(
-                prompt=styled_prompt,
+            results = generate_images_from_text(
+                styled_prompts,
                 guidance_scale=7.5,
                 num_steps=35,
                 model_id=model_id
             )
             
-            if image:
-                images.append(image)
+            images.extend(result["image"] for result in results if result["image"])
                 
         except Exception as e:
-            logger.error(f"Stil transferi hatası ({style}): {e}")
+            logger.error(f"Stil transferi hatası ({model_id}): {e}")
     
     return images
 
@@ -139,20 +140,23 @@ def run_advanced_editing_workflow(prompt):
             "dark mood, dramatic shadows"
         ]
         
-        for var in variations:
-            try:
-                modified = generate_image_from_image(
-                    init_image=base_image,
-                    prompt=f"{prompt}, {var}",
-                    strength=0.5,
-                    num_steps=25
-                )
-                
+        # Tüm varyasyonlar ortak latent üzerinde tek bir toplu geçişte üretilir
+        try:
+            modified_images = generate_image_from_image(
+                init_image=base_image,
+                prompt=[f"{prompt}, {var}" for var in variations],
+                strength=0.5,
+                num_steps=25
+            )
+            
+            for var, modified in zip(variations, modified_images):
                 if modified:
                     images.append(modified)
-                    
-            except Exception as e:
-                logger.error(f"Varyasyon oluşturma hatası ({var}): {e}")
+                else:
+                    logger.error(f"Varyasyon oluşturulamadı: {var}")
+                
+        except Exception as e:
+            logger.error(f"Varyasyon oluşturma hatası: {e}")
         
         # 3. Görsele LoRA uygula (eğer uygunsa)
         if "character" in prompt.lower() or "portrait" in prompt.lower():